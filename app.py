@@ -1,12 +1,16 @@
 import os
 import json
-import base64
+import time
 import streamlit as st
 from dotenv import set_key
 import assist
+import logos
+import recipes
 
 from settings import *
 from helpers import *
+from thumbnails import thumbnail_url
+from appdata import load_config, load_cocktail_data, find_cocktail, image_bytes
 
 # Import your controller module
 import controller
@@ -29,27 +33,96 @@ if not os.path.exists(LOGO_FOLDER):
 # We'll just keep track in session state if we show the gallery or the detail page
 if "selected_cocktail" not in st.session_state:
     st.session_state.selected_cocktail = None
-
-
-saved_config = load_saved_config()
-# Load the cocktails from file
-cocktail_data = {}
-if os.path.exists(COCKTAILS_FILE):
+if "gallery_page" not in st.session_state:
+    st.session_state.gallery_page = 1
+# This session's drinks: each pours in the background on the shared PumpScheduler, queued behind
+# other sessions' orders, while the page stays usable.
+if "pour_jobs" not in st.session_state:
+    st.session_state.pour_jobs = []
+
+# Cached until the file changes; each tab below is a fragment that reruns on its own and reads it again.
+saved_config = load_config()
+
+
+# ---------- Pumping jobs ----------
+def job_status(name, executor_watcher, key):
+    """Progress of a running job with a Cancel button, or how it ended. Returns True once it's done."""
+    progress = executor_watcher.progress()
+    if progress["done"]:
+        if progress["cancelled"]:
+            st.warning(f"{name} cancelled.")
+        else:
+            st.success(f"{name} complete.")
+        return True
+
+    eta = progress["eta_seconds"]
+    eta_text = f"about {eta:.0f} s left" if eta is not None else "waiting for the pumps..."
+    st.progress(progress["fraction"], text=f"{name}: {eta_text}")
+    for pour in progress["pours"]:
+        st.caption(f"{pour['label']}: {pour['elapsed_seconds']:.0f} / {pour['planned_seconds']:.0f} s")
+    if st.button("Cancel", key=f"cancel_{key}"):
+        controller.cancel(executor_watcher)
+    return False
+
+
+def start_pour(cocktail, single_or_double="single"):
+    """Queue a drink in the background and follow it in the sidebar."""
+    normal_name = cocktail.get("normal_name", "unknown_drink")
     try:
-        with open(COCKTAILS_FILE, "r") as f:
-            cocktail_data = json.load(f)
+        executor_watcher = controller.make_drink(cocktail, single_or_double=single_or_double)
     except Exception as e:
-        st.error(f"Error loading cocktails: {e}")
+        st.error(f"Error while pouring: {e}")
+        return
+    if executor_watcher is None:
+        skipped = ()
+        if os.path.exists(CONFIG_FILE) and cocktail.get("ingredients"):
+            skipped = recipes.compile_recipe(cocktail, single_or_double).skipped
+        st.error(f"Can't pour {normal_name}: {' '.join(skipped) or 'check the pump configuration and recipe.'}")
+        return
+    st.session_state.pour_jobs.append({"name": normal_name, "watcher": executor_watcher,
+                                       "key": f"pour_{id(executor_watcher)}"})
+    st.toast(f"Pouring a single serving of {normal_name}...")
+
+
+def dismiss_pour(key):
+    st.session_state.pour_jobs = [job for job in st.session_state.pour_jobs if job["key"] != key]
+
+
+@st.fragment(run_every=1)
+def pour_progress():
+    """This session's pours, refreshed every second on their own without rerunning the page."""
+    for job in st.session_state.pour_jobs:
+        if job_status(job["name"], job["watcher"], job["key"]):
+            st.button("Dismiss", key=f"dismiss_{job['key']}", on_click=dismiss_pour, args=(job["key"],))
+
+
+# ---------- Emergency Stop ----------
+with st.sidebar:
+    if st.button("Emergency Stop", type="primary"):
+        dispensed = controller.emergency_stop()
+        st.error("All pumps stopped.")
+        if dispensed:
+            st.json({ingredient: round(ounces, 2) for ingredient, ounces in dispensed.items()})
+    pour_progress()
 
 
 # ---------- Tabs ----------
 tabs = st.tabs(["My Bar", "Settings", "Cocktail Menu", "Add Cocktail"])
 
 # ================ TAB 1: My Bar ================
-with tabs[0]:
+@st.fragment
+def my_bar():
+    """Pump names and recipe generation; typing here reruns only this tab."""
     st.markdown("<h1 style='text-align: center;'>My Bar</h1>", unsafe_allow_html=True)
     st.markdown("<p style='text-align: center;'>Enter the drink names for each pump:</p>", unsafe_allow_html=True)
     
+    saved_config = load_config()
+    message = st.session_state.pop("generate_message", None)
+    if message:
+        st.success(message)
+    for failure in st.session_state.pop("generate_failures", []):
+        st.warning(f"No logo for {failure}")
+
     pump_inputs = {}
 
     col1, col2 = st.columns(2)
@@ -96,182 +169,222 @@ with tabs[0]:
         save_cocktails(cocktails_json, not clear_cocktails)
         
         st.markdown("<h2 style='text-align: center;'>Generating Cocktail Logos...</h2>", unsafe_allow_html=True)
-        cocktails = cocktails_json.get("cocktails", [])
-        total = len(cocktails) if cocktails else 1
+        names = [cocktail.get("normal_name", "unknown_drink") for cocktail in cocktails_json.get("cocktails", [])]
+        total = len(names) if names else 1
         progress_bar = st.progress(0, text="Generating images...")
 
-        for idx, cocktail in enumerate(cocktails):
-            normal_name = cocktail.get("normal_name", "unknown_drink")
-            generate_image(normal_name)
-            progress_bar.progress((idx + 1) / total)
+        # Logos are made LOGO_CONCURRENCY at a time and reported as each one finishes.
+        started = time.perf_counter()
+        jobs = []
+        for job in logos.LogoPipeline().run(names):
+            jobs.append(job)
+            progress_bar.progress(len(jobs) / total, text=f"Generating images... ({len(jobs)} of {len(names)})")
 
         progress_bar.empty()
-        st.success("Image generation complete.")
+        # Rerun the whole app so the other tabs show the new menu.
+        st.session_state.generate_message = (
+            f"Image generation complete: {logos.summarize(jobs, time.perf_counter() - started)}.")
+        st.session_state.generate_failures = [job.describe() for job in jobs if not job.ok]
+        st.rerun()
+
+
+with tabs[0]:
+    my_bar()
 
 # ================ TAB 2: Settings ================
+@st.fragment(run_every=1)
+def maintenance_progress():
+    """Live progress of the running prime/clean cycle; reruns on its own every second."""
+    job = st.session_state.get("maintenance_job")
+    if job is None:
+        return
+    name, executor_watcher = job
+    if job_status(name, executor_watcher, "maintenance"):
+        if st.button("Dismiss", key="dismiss_maintenance"):
+            st.session_state.maintenance_job = None
+            st.rerun()
+
+
 with tabs[1]:
     st.title("Settings")
 
-    st.subheader("Prime Pumps")
-    if st.button("Prime Pumps"):
-        st.info("Priming all pumps for 10 seconds each...")
-        try:
-            controller.prime_pumps(duration=10)
-            st.success("Pumps primed successfully!")
-        except Exception as e:
-            st.error(f"Error priming pumps: {e}")
-
-    # NEW: Clean Pumps
-    st.subheader("Clean Pumps")
-    if st.button("Clean Pumps"):
-        st.info("Reversing all pumps for 10 seconds each (cleaning mode)...")
-        try:
-            controller.clean_pumps(duration=10)
-            st.success("All pumps reversed (cleaned).")
-        except Exception as e:
-            st.error(f"Error cleaning pumps: {e}")
+    st.subheader("Prime / Clean Pumps")
+    pump_options = list(range(len(controller.MOTORS)))
+
+    def pump_label(pump_index):
+        ingredient = saved_config.get(f"Pump {pump_index + 1}", "")
+        return f"Pump {pump_index + 1}" + (f" ({ingredient})" if ingredient else "")
+
+    selected_pumps = st.multiselect("Pumps", pump_options, default=pump_options, format_func=pump_label)
+    duration = st.number_input("Seconds per pump", min_value=1.0, max_value=120.0, value=10.0, step=1.0)
+    duration_overrides = {}
+    with st.expander("Per-pump durations (0 = use the default above)"):
+        for pump_index in selected_pumps:
+            seconds = st.number_input(pump_label(pump_index), min_value=0.0, max_value=120.0, value=0.0,
+                                      step=1.0, key=f"duration_pump_{pump_index}")
+            if seconds > 0:
+                duration_overrides[pump_index] = seconds
+
+    job_running = (st.session_state.get("maintenance_job") is not None
+                   and not st.session_state.maintenance_job[1].done())
+    cols = st.columns(2)
+    with cols[0]:
+        if st.button("Prime Pumps", disabled=job_running or not selected_pumps):
+            try:
+                st.session_state.maintenance_job = (
+                    "Priming", controller.prime_pumps(duration, selected_pumps, duration_overrides))
+            except Exception as e:
+                st.error(f"Error priming pumps: {e}")
+    with cols[1]:
+        if st.button("Clean Pumps", disabled=job_running or not selected_pumps):
+            try:
+                st.session_state.maintenance_job = (
+                    "Cleaning", controller.clean_pumps(duration, selected_pumps, duration_overrides))
+            except Exception as e:
+                st.error(f"Error cleaning pumps: {e}")
+
+    maintenance_progress()
 
 # ================ TAB 3: Cocktail Menu ================
-with tabs[2]:
-    st.markdown("<h1 style='text-align: center;'>Cocktail Menu</h1>", unsafe_allow_html=True)
+def select_cocktail(safe_name):
+    """Button callback: show this cocktail's recipe (or the gallery, for None) in the rerun the click starts."""
+    st.session_state.selected_cocktail = safe_name
 
-    if st.session_state.selected_cocktail:
-        # USER IS VIEWING A COCKTAIL DETAIL PAGE
-        safe_name = st.session_state.selected_cocktail
-        selected_cocktail = None
 
-        # Find the matching cocktail in the JSON
-        for c in cocktail_data.get("cocktails", []):
-            if get_safe_name(c.get("normal_name", "")) == safe_name:
-                selected_cocktail = c
-                break
+def recipe_detail(safe_name):
+    """The selected cocktail: its logo, a slider per ingredient, Save and Pour."""
+    position, selected_cocktail = find_cocktail(safe_name)
+
+    if selected_cocktail is None:
+        st.error("Cocktail not found.")
+    else:
+        st.markdown(
+            f"<h1 style='text-align: center;'>{selected_cocktail.get('fun_name', 'Cocktail')}</h1>",
+            unsafe_allow_html=True
+        )
+        st.markdown(
+            f"<h3 style='text-align: center;'>{selected_cocktail.get('normal_name', '')}</h3>",
+            unsafe_allow_html=True
+        )
 
-        if selected_cocktail is None:
-            st.error("Cocktail not found.")
+        # Show the image if it exists
+        image = image_bytes(os.path.join(LOGO_FOLDER, f"{safe_name}.png"))
+        if image is not None:
+            st.image(image, use_container_width=True)
         else:
-            st.markdown(
-                f"<h1 style='text-align: center;'>{selected_cocktail.get('fun_name', 'Cocktail')}</h1>",
-                unsafe_allow_html=True
-            )
-            st.markdown(
-                f"<h3 style='text-align: center;'>{selected_cocktail.get('normal_name', '')}</h3>",
-                unsafe_allow_html=True
+            st.write("Image not found.")
+
+        # Show the recipe
+        st.markdown("<h2 style='text-align: center;'>Recipe</h2>", unsafe_allow_html=True)
+        recipe_adjustments = {}
+        for ingredient, measurement in selected_cocktail.get("ingredients", {}).items():
+            parts = measurement.split()
+            try:
+                default_value = float(parts[0])
+                unit = " ".join(parts[1:]) if len(parts) > 1 else ""
+            except:
+                default_value = 1.0
+                unit = measurement
+
+            value = st.slider(
+                f"{ingredient} ({measurement})",
+                min_value=0.0,
+                max_value=default_value * 4,
+                value=default_value,
+                step=0.1,
             )
+            recipe_adjustments[ingredient] = f"{value} {unit}".strip()
 
-            # Show the image if it exists
-            image_file = os.path.join(LOGO_FOLDER, f"{safe_name}.png")
-            if os.path.exists(image_file):
-                st.image(image_file, use_container_width=True)
-            else:
-                st.write("Image not found.")
+        st.markdown("<h3 style='text-align: center;'><strong>Adjusted Recipe</strong></h3>", unsafe_allow_html=True)
+        st.json(recipe_adjustments)
 
-            # Show the recipe
-            st.markdown("<h2 style='text-align: center;'>Recipe</h2>", unsafe_allow_html=True)
-            recipe_adjustments = {}
-            for ingredient, measurement in selected_cocktail.get("ingredients", {}).items():
-                parts = measurement.split()
+        cols = st.columns([1, 1])
+        with cols[0]:
+            if st.button("Save Recipe"):
+                # Overwrite the JSON with new measurements (on a copy of the cached menu)
+                cocktail_data = load_cocktail_data()
+                cocktail_data["cocktails"][position]["ingredients"] = recipe_adjustments
                 try:
-                    default_value = float(parts[0])
-                    unit = " ".join(parts[1:]) if len(parts) > 1 else ""
-                except:
-                    default_value = 1.0
-                    unit = measurement
-
-                value = st.slider(
-                    f"{ingredient} ({measurement})",
-                    min_value=0.0,
-                    max_value=default_value * 4,
-                    value=default_value,
-                    step=0.1,
+                    with open(COCKTAILS_FILE, "w") as f:
+                        json.dump(cocktail_data, f, indent=2)
+                    st.success("Recipe saved!")
+                except Exception as e:
+                    st.error(f"Error saving recipe: {e}")
+
+        with cols[1]:
+            if st.button("Pour"):
+                # The 'selected_cocktail' is already a dict from cocktails.json
+                # so we can pass it directly.
+                start_pour(selected_cocktail)
+
+    # Back to gallery
+    st.button("Back to Menu", on_click=select_cocktail, args=(None,))
+
+
+def gallery():
+    """One page of the menu, each cocktail with its thumbnail, View and Pour."""
+    cocktails_list = load_cocktail_data().get("cocktails", [])
+    if not cocktails_list:
+        st.markdown("<p style='text-align: center;'>No recipes generated yet. Please use the 'My Bar' tab to generate recipes.</p>", unsafe_allow_html=True)
+        return
+
+    # Only a page is drawn, so a rerun costs the same however long the menu gets.
+    pages = (len(cocktails_list) + GALLERY_PAGE_SIZE - 1) // GALLERY_PAGE_SIZE
+    st.session_state.gallery_page = min(st.session_state.gallery_page, pages)
+    if pages > 1:
+        st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="gallery_page")
+    first = (st.session_state.gallery_page - 1) * GALLERY_PAGE_SIZE
+
+    for cocktail in cocktails_list[first:first + GALLERY_PAGE_SIZE]:
+        normal_name = cocktail.get("normal_name", "unknown_drink")
+        safe_cname = get_safe_name(normal_name)
+        filename = os.path.join(LOGO_FOLDER, f"{safe_cname}.png")
+
+        st.markdown(f"<h3 style='text-align: center;'>{normal_name}</h3>", unsafe_allow_html=True)
+        if os.path.exists(filename):
+            # A small thumbnail served as a static file instead of the full logo inlined.
+            url = thumbnail_url(filename)
+            if url:
+                st.markdown(
+                    f"<div style='text-align: center;'><img src='{url}' width='300' loading='lazy'></div>",
+                    unsafe_allow_html=True,
                 )
-                recipe_adjustments[ingredient] = f"{value} {unit}".strip()
-
-            st.markdown("<h3 style='text-align: center;'><strong>Adjusted Recipe</strong></h3>", unsafe_allow_html=True)
-            st.json(recipe_adjustments)
-
-            cols = st.columns([1, 1])
-            with cols[0]:
-                if st.button("Save Recipe"):
-                    updated = False
-                    # Overwrite the JSON with new measurements
-                    for idx, cktl in enumerate(cocktail_data.get("cocktails", [])):
-                        if get_safe_name(cktl.get("normal_name", "")) == safe_name:
-                            cocktail_data["cocktails"][idx]["ingredients"] = recipe_adjustments
-                            updated = True
-                            break
-                    if updated:
-                        try:
-                            with open(COCKTAILS_FILE, "w") as f:
-                                json.dump(cocktail_data, f, indent=2)
-                            st.success("Recipe saved!")
-                        except Exception as e:
-                            st.error(f"Error saving recipe: {e}")
-                    else:
-                        st.error("Failed to update recipe.")
-
-            with cols[1]:
-                if st.button("Pour"):
-                    note = st.info("Pouring a single serving...")
-                    # We call controller.make_drink with single
-                    # Build a dictionary that matches what the controller expects
-                    # The 'selected_cocktail' is already a dict from cocktails.json
-                    # so we can pass it directly.
-                    try:
-                        executor_watcher = controller.make_drink(selected_cocktail, single_or_double="single")
-                        while not executor_watcher.done():
-                            pass
-                        note.empty()
-                    except Exception as e:
-                        st.error(f"Error while pouring: {e}")
-
-            # Back to gallery
-            if st.button("Back to Menu"):
-                st.session_state.selected_cocktail = None
-                st.rerun()
+            else:
+                st.image(filename, width=300)
+        else:
+            st.markdown("<p style='text-align: center;'>Image not found.</p>", unsafe_allow_html=True)
+
+        # Buttons
+        btn_cols = st.columns([2, 1, 1, 2])
+        with btn_cols[1]:
+            st.button("View", key=f"view_{safe_cname}", on_click=select_cocktail, args=(safe_cname,))
+        with btn_cols[2]:
+            if st.button("Pour", key=f"pour_{safe_cname}"):
+                # If they pour from the gallery, we can do single as well,
+                # but we have no way to adjust recipe first. We'll just pour the default recipe.
+                start_pour(cocktail)
+
+
+@st.fragment
+def cocktail_menu():
+    """The gallery or one recipe; browsing, sliders and pours rerun only this tab."""
+    st.markdown("<h1 style='text-align: center;'>Cocktail Menu</h1>", unsafe_allow_html=True)
 
+    if st.session_state.selected_cocktail:
+        # USER IS VIEWING A COCKTAIL DETAIL PAGE
+        recipe_detail(st.session_state.selected_cocktail)
     else:
         # GALLERY VIEW
-        cocktails_list = cocktail_data.get("cocktails", [])
-        if cocktails_list:
-            for cocktail in cocktails_list:
-                normal_name = cocktail.get("normal_name", "unknown_drink")
-                safe_cname = get_safe_name(normal_name)
-                filename = os.path.join(LOGO_FOLDER, f"{safe_cname}.png")
-
-                st.markdown(f"<h3 style='text-align: center;'>{normal_name}</h3>", unsafe_allow_html=True)
-                if os.path.exists(filename):
-                    with open(filename, "rb") as image_file:
-                        encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-                    st.markdown(
-                        f"<div style='text-align: center;'><img src='data:image/png;base64,{encoded_string}' width='300'></div>",
-                        unsafe_allow_html=True,
-                    )
-                else:
-                    st.markdown("<p style='text-align: center;'>Image not found.</p>", unsafe_allow_html=True)
-
-                # Buttons
-                btn_cols = st.columns([2, 1, 1, 2])
-                with btn_cols[1]:
-                    if st.button("View", key=f"view_{safe_cname}"):
-                        st.session_state.selected_cocktail = safe_cname
-                        st.rerun()
-                with btn_cols[2]:
-                    if st.button("Pour", key=f"pour_{safe_cname}"):
-                        # If they pour from the gallery, we can do single as well,
-                        # but we have no way to adjust recipe first. We'll just pour the default recipe.
-                        note = st.info(f"Pouring a single serving of {normal_name} ...")
-                        try:
-                            executor_watcher = controller.make_drink(cocktail, single_or_double="single")
-                            while not executor_watcher.done():
-                                pass
-                            note.empty()
-                        except Exception as e:
-                            st.error(f"Error while pouring: {e}")
-        else:
-            st.markdown("<p style='text-align: center;'>No recipes generated yet. Please use the 'My Bar' tab to generate recipes.</p>", unsafe_allow_html=True)
+        gallery()
+
+
+with tabs[2]:
+    cocktail_menu()
 
 # ================ TAB 4: Add Cocktail ================
-with tabs[3]:
+@st.fragment
+def add_cocktail():
+    """A hand-made recipe; its sliders rerun only this tab."""
     st.markdown("<h1 style='text-align: center;'>Add Cocktail</h1>", unsafe_allow_html=True)
     st.markdown("<h2 style='text-align: center;'>Recipe</h2>", unsafe_allow_html=True)
     recipe = {
@@ -283,6 +396,7 @@ with tabs[3]:
     )
     recipe['fun_name'] = recipe['normal_name']
 
+    saved_config = load_config()
     for index, pump in enumerate(saved_config):
         ingredient = saved_config[pump]
         value = st.slider(
@@ -296,6 +410,12 @@ with tabs[3]:
             recipe['ingredients'][ingredient] = f"{value} oz".strip()
 
     if st.button("Save") and recipe['normal_name'] and len(recipe['ingredients']) > 0:
-        if recipe['normal_name'] not in list(map(lambda x: x['normal_name'], cocktail_data['cocktails'])):
+        if find_cocktail(get_safe_name(recipe['normal_name']))[1] is None:
             generate_image(recipe['normal_name'])
-            save_cocktails({'cocktails': [recipe]})
\ No newline at end of file
+            save_cocktails({'cocktails': [recipe]})
+            # Rerun the whole app so the menu shows the new cocktail.
+            st.rerun()
+
+
+with tabs[3]:
+    add_cocktail()
@@ -0,0 +1,70 @@
+# appdata.py
+"""
+Cached reads of the data files for the Streamlit app.
+
+Every widget interaction reruns app.py, and fragments rerun on their own;
+these keep a rerun from reading and parsing pump_config.json, cocktails.json
+or a logo again. Each cache is keyed on the file's (mtime, size), so a change
+from anywhere (the app, the kiosk, an editor) shows up on the next rerun.
+"""
+import os
+
+import streamlit as st
+
+from settings import *
+from helpers import load_saved_config, load_cocktails, get_safe_name
+
+
+def file_version(path):
+    """(mtime_ns, size) of `path`, or None if it doesn't exist: the cache key for its contents."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _config(version):
+    return load_saved_config()
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cocktails(version):
+    data = load_cocktails()
+    index = {get_safe_name(cocktail.get("normal_name", "")): position
+             for position, cocktail in enumerate(data.get("cocktails", []))}
+    return data, index
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _image_bytes(path, version):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def load_config():
+    """pump_config.json as a dict (a copy: changing it doesn't touch the cache)."""
+    return _config(file_version(CONFIG_FILE))
+
+
+def load_cocktail_data():
+    """cocktails.json as a dict (a copy: changing it doesn't touch the cache)."""
+    return _cocktails(file_version(COCKTAILS_FILE))[0]
+
+
+def find_cocktail(safe_name):
+    """(position, cocktail) in cocktails.json for a get_safe_name() name, or (None, None)."""
+    data, index = _cocktails(file_version(COCKTAILS_FILE))
+    position = index.get(safe_name)
+    if position is None:
+        return None, None
+    return position, data["cocktails"][position]
+
+
+def image_bytes(path):
+    """The bytes of an image file, read once per version; None if it doesn't exist."""
+    version = file_version(path)
+    if version is None:
+        return None
+    return _image_bytes(path, version)
@@ -0,0 +1,451 @@
+# assets.py
+"""
+Image caches for the pygame interface.
+
+DiskImageCache keeps every image pre-scaled to the screen as raw pixels in
+the display's byte order under SURFACE_CACHE_DIR, keyed by the source's
+content hash and the size, so a cold start mmaps files instead of decoding
+and scaling PNGs. `python assets.py --size 800x480` builds it ahead of
+time; otherwise it fills itself on first use.
+
+AssetRegistry loads the static UI art (background, buttons, pouring
+overlays) once, scaled and converted for the display, and records how long
+each asset took in the metrics registry.
+
+RotationFrames pre-renders a spinner's rotations once, cropped to their
+visible pixels, so an animation frame is a blit instead of a rotate.
+
+TextCache keeps fonts by size and rendered text surfaces by (text, size,
+color), so a steady frame never looks up a font or rasterizes text.
+
+SurfaceCache keeps decoded, pre-scaled cocktail cards in an LRU bounded by a
+memory budget, and a background thread prefetches the cards around the
+current one so a swipe never waits on PNG decode or scaling.
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import hashlib
+import argparse
+import threading
+import collections
+
+import pygame
+
+import metrics
+from settings import *
+from menu import logo_file_name
+from helpers import read_json, write_atomic
+
+CACHE_HITS = metrics.REGISTRY.counter(
+    "tipsy_surface_cache_hits_total", "Cocktail cards served from the surface cache.")
+CACHE_MISSES = metrics.REGISTRY.counter(
+    "tipsy_surface_cache_misses_total", "Cocktail cards decoded on the render thread.")
+
+ASSET_LOAD_SECONDS = metrics.REGISTRY.gauge(
+    "tipsy_asset_load_seconds", "Time to load, scale and convert each static interface asset.")
+DISK_CACHE_HITS = metrics.REGISTRY.counter(
+    "tipsy_disk_image_cache_hits_total", "Images mapped from the pre-scaled on-disk cache.")
+DISK_CACHE_MISSES = metrics.REGISTRY.counter(
+    "tipsy_disk_image_cache_misses_total", "Images decoded and scaled because the on-disk cache lacked them.")
+
+BUTTON_SIZE = (150, 150)
+SPINNER_SIZE = (720, 720)
+
+# Static interface art: name -> (path, size, alpha). A size of None means the screen size.
+INTERFACE_ART = {
+    "background": ("./tipsy.png", None, False),
+    "single": ("single.png", BUTTON_SIZE, True),
+    "double": ("double.png", BUTTON_SIZE, True),
+    "pouring": ("pouring.png", None, True),
+    "loading": ("loading.png", SPINNER_SIZE, True),
+}
+
+
+def cocktail_image_path(cocktail):
+    """Path of a cocktail's logo: its normal_name in lower snake_case, in LOGO_FOLDER."""
+    return os.path.join(LOGO_FOLDER, logo_file_name(cocktail))
+
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+def pixel_format():
+    """Byte order of the display's 32-bit pixels, so cached images convert with a plain copy."""
+    display = pygame.display.get_surface() if pygame.display.get_init() else None
+    if display is not None and display.get_masks()[:3] == (0xff, 0xff00, 0xff0000):
+        return "RGBA"
+    return "BGRA"
+
+
+class DiskImageCache:
+    """
+    Images scaled to a size, stored as raw pixels named by the source's
+    content hash, the size and the byte order. Source hashes are remembered
+    by (mtime, size) in an index, so unchanged files aren't read either.
+    """
+
+    def __init__(self, directory=SURFACE_CACHE_DIR):
+        self.directory = directory
+        self._index_path = os.path.join(directory, "index.json")
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _index_locked(self):
+        if self._index is None:
+            self._index = read_json(self._index_path)
+        return self._index
+
+    def source_hash(self, path):
+        """Content hash of `path`, recomputed only when its mtime or size changes."""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._index_locked().get(key)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        with self._lock:
+            index = self._index_locked()
+            index[key] = [stat.st_mtime_ns, stat.st_size, digest]
+            write_atomic(self._index_path, json.dumps(index, indent=1))
+        return digest
+
+    def cache_path(self, digest, size, fmt):
+        return os.path.join(self.directory, f"{digest[:20]}-{size[0]}x{size[1]}.{fmt.lower()}")
+
+    def _read(self, cache_path, size, fmt):
+        try:
+            f = open(cache_path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            if os.fstat(f.fileno()).st_size != size[0] * size[1] * 4:
+                return None
+            # The surface keeps the mapping alive. Copy-on-write, so drawing on a surface that was never
+            # converted (e.g. before the display is set) changes private pages instead of faulting.
+            return pygame.image.frombuffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY), size, fmt)
+
+    def load(self, path, size):
+        """`path` scaled to `size`: mapped from the cache, or decoded, scaled and written to it."""
+        size = tuple(size)
+        fmt = pixel_format()
+        cache_path = self.cache_path(self.source_hash(path), size, fmt)
+        surface = self._read(cache_path, size, fmt)
+        if surface is not None:
+            DISK_CACHE_HITS.inc()
+            return surface
+        DISK_CACHE_MISSES.inc()
+        surface = pygame.transform.scale(pygame.image.load(path), size)
+        try:
+            write_atomic(cache_path, pygame.image.tobytes(surface, fmt))
+        except OSError as e:
+            print(f"Could not cache {path} in {self.directory}: {e}")
+        return surface
+
+    def prune(self, keep):
+        """Delete cached images other than the paths in `keep`. Returns how many were removed."""
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.name != "index.json" and entry.path not in keep:
+                os.remove(entry.path)
+                removed += 1
+        return removed
+
+
+disk_cache = DiskImageCache() if SURFACE_CACHE_DIR else None
+
+
+def load_scaled(path, size):
+    """`path` decoded and scaled to `size`, through the on-disk cache when there is one."""
+    if disk_cache is not None:
+        return disk_cache.load(path, size)
+    return pygame.transform.scale(pygame.image.load(path), size)
+
+
+class AssetRegistry:
+    """
+    Static interface art, registered by name with a path and target size.
+    Each asset is loaded, scaled and converted once, either up front by
+    preload() or on first get(); failures are remembered and return None.
+    """
+
+    def __init__(self):
+        self._specs = {}
+        self._surfaces = {}
+        self.load_seconds = {}
+
+    def register(self, name, path, size=None, alpha=True):
+        """Register `path` under `name`, scaled to `size` (if given); opaque art can skip the alpha channel."""
+        self._specs[name] = (path, tuple(size) if size else None, alpha)
+        self._surfaces.pop(name, None)
+
+    def _load(self, name):
+        path, size, alpha = self._specs[name]
+        started = time.perf_counter()
+        try:
+            surface = load_scaled(path, size) if size else pygame.image.load(path)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha() if alpha else surface.convert()
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            surface = None
+        seconds = time.perf_counter() - started
+        self.load_seconds[name] = seconds
+        ASSET_LOAD_SECONDS.set(seconds, asset=name)
+        return surface
+
+    def get(self, name):
+        """The surface registered as `name`, or None if it failed to load."""
+        if name not in self._surfaces:
+            self._surfaces[name] = self._load(name)
+        return self._surfaces[name]
+
+    def preload(self):
+        """Load every registered asset now. Returns the total load time in seconds."""
+        for name in self._specs:
+            self.get(name)
+        return sum(self.load_seconds.values())
+
+
+class SurfaceCache:
+    """
+    LRU of images scaled to `size`, keyed by (path, size) and capped at
+    `budget_bytes`. prefetch() hands paths to a loader thread; get() returns
+    a cached surface or, on a miss, loads it on the calling thread.
+    """
+
+    def __init__(self, size, budget_bytes=SURFACE_CACHE_MB * 1024 * 1024):
+        self.size = tuple(size)
+        self.budget_bytes = budget_bytes
+        self._surfaces = collections.OrderedDict()  # (path, size) -> (surface, converted)
+        self._bytes = 0
+        self._wanted = collections.deque()
+        self._loading = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="surface-prefetch", daemon=True)
+        self._thread.start()
+
+    def _load(self, path):
+        try:
+            return load_scaled(path, self.size)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            return None
+
+    def _store(self, key, surface, converted):
+        """Insert under the lock and evict least recently used surfaces over budget."""
+        previous = self._surfaces.pop(key, None)
+        if previous is not None:
+            self._bytes -= surface_bytes(previous[0])
+        self._surfaces[key] = (surface, converted)
+        self._bytes += surface_bytes(surface)
+        # Never evict the newest entry, even if it alone is over budget.
+        while self._bytes > self.budget_bytes and len(self._surfaces) > 1:
+            _key, (evicted, _converted) = self._surfaces.popitem(last=False)
+            self._bytes -= surface_bytes(evicted)
+
+    def get(self, path, load=True):
+        """The surface for `path` at the cache's size, or None if it can't be loaded (or isn't cached, without `load`)."""
+        key = (path, self.size)
+        with self._condition:
+            # Don't decode twice if the loader is already on this one.
+            while self._loading == key:
+                self._condition.wait()
+            entry = self._surfaces.get(key)
+            if entry is not None:
+                self._surfaces.move_to_end(key)
+        if entry is None:
+            if not load:
+                return None
+            CACHE_MISSES.inc()
+            surface = self._load(path)
+            converted = False
+        else:
+            CACHE_HITS.inc()
+            surface, converted = entry
+        if surface is None:
+            return None
+        if not converted and pygame.display.get_surface() is not None:
+            # Convert on the render thread, where the display's pixel format is safe to use.
+            surface = surface.convert_alpha()
+            converted = True
+        with self._condition:
+            self._store(key, surface, converted)
+        return surface
+
+    def prefetch(self, paths):
+        """Load `paths` in the background, in order, replacing any earlier prefetch request."""
+        with self._condition:
+            self._wanted = collections.deque(paths)
+            # Keep what's about to be shown from being the next thing evicted.
+            for path in paths:
+                if (path, self.size) in self._surfaces:
+                    self._surfaces.move_to_end((path, self.size))
+            self._condition.notify_all()
+
+    def discard(self, paths):
+        """Forget the surfaces for `paths` (files that changed on disk); they're loaded again on next use."""
+        keys = {(path, self.size) for path in paths}
+        with self._condition:
+            # A load already under way would store the old image after we drop it.
+            while self._loading in keys:
+                self._condition.wait()
+            for key in keys:
+                entry = self._surfaces.pop(key, None)
+                if entry is not None:
+                    self._bytes -= surface_bytes(entry[0])
+
+    def stats(self):
+        with self._condition:
+            return {"surfaces": len(self._surfaces), "bytes": self._bytes, "budget_bytes": self.budget_bytes}
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._wanted and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                path = self._wanted.popleft()
+                key = (path, self.size)
+                if key in self._surfaces:
+                    continue
+                self._loading = key
+            surface = self._load(path)
+            with self._condition:
+                if surface is not None:
+                    self._store(key, surface, False)
+                self._loading = None
+                self._condition.notify_all()
+
+
+class RotationFrames:
+    """
+    `surface` rotated in `count` even steps, each frame cropped to its visible
+    pixels. Frames are rendered on first use, or all at once by render_all().
+    """
+
+    def __init__(self, surface, count=SPINNER_FRAMES):
+        self.surface = surface
+        self.count = count
+        self._frames = [None] * count
+
+    def frame(self, index):
+        """(surface, (dx, dy)) for frame `index`: draw it centered `dx, dy` from the spinner's center."""
+        index %= self.count
+        frame = self._frames[index]
+        if frame is None:
+            rotated = pygame.transform.rotate(self.surface, index * 360 / self.count)
+            center = rotated.get_rect().center
+            visible = rotated.get_bounding_rect()
+            if visible.width and visible.height:
+                rotated = rotated.subsurface(visible).copy()
+                center = (center[0] - visible.x, center[1] - visible.y)
+            offset = (rotated.get_width() // 2 - center[0], rotated.get_height() // 2 - center[1])
+            frame = self._frames[index] = (rotated, offset)
+        return frame
+
+    def rect(self, index, center):
+        surface, (dx, dy) = self.frame(index)
+        return surface.get_rect(center=(center[0] + dx, center[1] + dy))
+
+    def render_all(self):
+        """Render every frame now. Returns the time taken in seconds."""
+        started = time.perf_counter()
+        for index in range(self.count):
+            self.frame(index)
+        return time.perf_counter() - started
+
+    def nbytes(self):
+        return sum(surface_bytes(frame[0]) for frame in self._frames if frame is not None)
+
+
+class TextCache:
+    """Fonts keyed by size and an LRU of rendered text keyed by (text, size, color)."""
+
+    def __init__(self, max_surfaces=TEXT_CACHE_SIZE):
+        self.max_surfaces = max_surfaces
+        self._fonts = {}
+        self._surfaces = collections.OrderedDict()
+
+    def font(self, size):
+        font = self._fonts.get(size)
+        if font is None:
+            font = self._fonts[size] = pygame.font.SysFont(None, size)
+        return font
+
+    def render(self, text, size, color=(255, 255, 255)):
+        """Anti-aliased `text` at `size`, rendered once and reused."""
+        key = (text, size, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+        surface = self.font(size).render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_surfaces:
+            self._surfaces.popitem(last=False)
+        return surface
+
+
+def neighbours(index, count, distance):
+    """Indexes around `index` in a ring of `count`, nearest first, alternating next and previous."""
+    order = []
+    for step in range(1, distance + 1):
+        for candidate in ((index + step) % count, (index - step) % count):
+            if candidate != index and candidate not in order:
+                order.append(candidate)
+    return order
+
+
+def build(screen_size, prune=False):
+    """Fill the on-disk cache with the interface art and every cocktail logo at `screen_size`."""
+    jobs = [(path, size or screen_size) for path, size, _alpha in INTERFACE_ART.values()]
+    if os.path.isdir(LOGO_FOLDER):
+        jobs += [(entry.path, screen_size) for entry in os.scandir(LOGO_FOLDER) if entry.name.lower().endswith(".png")]
+    built = []
+    for path, size in jobs:
+        try:
+            disk_cache.load(path, size)
+            built.append(disk_cache.cache_path(disk_cache.source_hash(path), tuple(size), pixel_format()))
+        except Exception as e:
+            print(f"Error caching {path}: {e}")
+    removed = disk_cache.prune(set(built)) if prune else 0
+    return len(built), removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-scale the kiosk's images into the on-disk cache.")
+    parser.add_argument("--size", help="screen size as WIDTHxHEIGHT (default: the current display's)")
+    parser.add_argument("--prune", action="store_true", help="delete cached images that weren't just built")
+    args = parser.parse_args(argv)
+    if disk_cache is None:
+        print("SURFACE_CACHE_DIR is empty, nothing to build.")
+        return 1
+    pygame.display.init()
+    if args.size:
+        screen_size = tuple(int(part) for part in args.size.lower().split("x"))
+    else:
+        info = pygame.display.Info()
+        screen_size = (info.current_w, info.current_h)
+    started = time.perf_counter()
+    built, removed = build(screen_size, args.prune)
+    print(f"Cached {built} images at {screen_size[0]}x{screen_size[1]} in {SURFACE_CACHE_DIR} "
+          f"({time.perf_counter() - started:.1f} s, {removed} stale removed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
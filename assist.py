@@ -1,14 +1,15 @@
 import json
 from pydantic import BaseModel
 import os
-from openai import OpenAI, OpenAIError
 
 
 def get_client():
+    # openai is slow to import; only pay for it when a request is actually made.
+    from openai import OpenAI, OpenAIError
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise OpenAIError("The api_key client option must be set either by passing api_key to the client or by setting the OPENAI_API_KEY environment variable")
-    return OpenAI(api_key=api_key)
+    return OpenAI(api_key=api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
 
 # Pydantic models for documentation
 class Cocktail(BaseModel):
@@ -74,9 +75,12 @@ def generate_cocktails(pump_to_drink: dict, requests_for_bartender: str = "", ex
     except Exception as e:
         return {"error": str(e)}
 
-def generate_image(prompt: str) -> str:
+def generate_image(prompt: str, **client_options) -> str:
+    """URL of a DALL-E 3 image for `prompt`; client_options (e.g. timeout, max_retries) go to the OpenAI client."""
     try:
         client = get_client()
+        if client_options:
+            client = client.with_options(**client_options)
         response = client.images.generate(
             model="dall-e-3",
             prompt=prompt,
@@ -87,4 +91,4 @@ def generate_image(prompt: str) -> str:
         image_url = response.data[0].url
         return image_url
     except Exception as e:
-        raise Exception(f"Image generation error: {e}")
+        raise Exception(f"Image generation error: {e}") from e
@@ -0,0 +1,235 @@
+# background.py
+"""
+Background removal for cocktail logos, in worker processes.
+
+rembg.remove() without a session sets the ONNX model up again for every
+image. BackgroundRemover starts REMBG_WORKERS processes that each load the
+REMBG_MODEL session once, when they start, and keep it for as long as they
+run; images are queued to them and come back as RGBA PIL images. The model
+and its inference memory stay out of the Streamlit process, and each worker
+gets an equal share of the CPU cores, so a queue of images keeps every core
+busy without the workers' thread pools fighting over them.
+
+    python background.py drink_logos/*.png --out /tmp/cutouts   # a batch, reporting images per second
+"""
+import io
+import os
+import sys
+import time
+import atexit
+import argparse
+import threading
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from settings import *
+
+REMBG_IMAGES = metrics.REGISTRY.counter(
+    "tipsy_rembg_images_total", "Images whose background was removed.")
+REMBG_SECONDS = metrics.REGISTRY.histogram(
+    "tipsy_rembg_seconds", "Time a worker took to remove one image's background, queueing excluded.",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60))
+REMBG_IMAGES_PER_SECOND = metrics.REGISTRY.gauge(
+    "tipsy_rembg_images_per_second", "Background removal throughput while images were queued.")
+
+# Set in each worker process by _start_worker.
+_session = None
+_session_error = None
+
+
+def _start_worker(model, threads):
+    """Process pool initializer: load the model once, for the life of the worker."""
+    global _session, _session_error
+    # rembg sizes the ONNX Runtime thread pools from OMP_NUM_THREADS.
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        from rembg import new_session
+        _session = new_session(model)
+    except Exception as e:
+        # Reported with each image: an initializer that raises only leaves a BrokenProcessPool behind.
+        _session_error = f"Couldn't load the {model} background removal model: {e}"
+
+
+def _remove(data):
+    if _session is None:
+        raise RuntimeError(_session_error)
+    from PIL import Image
+    from rembg import remove
+    started = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as image:
+        cutout = remove(image.convert("RGBA"), session=_session)
+    return cutout, time.perf_counter() - started
+
+
+class BackgroundRemover:
+    """
+    A pool of `workers` processes removing backgrounds with `model`. The
+    processes start with the first image and run until close().
+    """
+
+    def __init__(self, workers=REMBG_WORKERS, model=REMBG_MODEL):
+        self.workers = max(1, workers)
+        self.model = model
+        self.images = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._queued = 0
+        self._busy_since = None
+        self._busy_seconds = 0.0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                # Spawned rather than forked: a fork of the threaded Streamlit process isn't safe.
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_start_worker, initargs=(self.model, threads))
+            return self._pool
+
+    def _discard(self, pool):
+        """Drop a pool whose worker died (e.g. out of memory), so the next image starts a new one."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def _submit(self, data):
+        """Hand `data` to a worker. Returns (pool, Future); retries once on a new pool if the current one broke."""
+        pool = self._executor()
+        try:
+            return pool, pool.submit(_remove, data)
+        except BrokenProcessPool:
+            # A worker died before its pool's done callback could replace the pool.
+            self._discard(pool)
+            pool = self._executor()
+            return pool, pool.submit(_remove, data)
+
+    def submit(self, data):
+        """Queue one image (PNG or JPEG bytes). Returns a Future of the RGBA PIL image."""
+        pool, queued = self._submit(data)
+        result = concurrent.futures.Future()
+        # Counted only once a worker has it, so a submit that raises can't leave the gauge busy.
+        with self._lock:
+            if self._queued == 0:
+                self._busy_since = time.perf_counter()
+            self._queued += 1
+
+        def done(future):
+            try:
+                cutout, seconds = future.result()
+            except BrokenProcessPool as e:
+                self._discard(pool)
+                cutout, error = None, e
+            except Exception as e:
+                cutout, error = None, e
+            else:
+                error = None
+                REMBG_IMAGES.inc()
+                REMBG_SECONDS.observe(seconds)
+            with self._lock:
+                self._queued -= 1
+                if error is None:
+                    self.images += 1
+                if self._queued == 0:
+                    self._busy_seconds += time.perf_counter() - self._busy_since
+                REMBG_IMAGES_PER_SECOND.set(self._images_per_second())
+            if error is None:
+                result.set_result(cutout)
+            else:
+                result.set_exception(error)
+
+        queued.add_done_callback(done)
+        return result
+
+    def remove(self, data):
+        """The image in `data` with its background removed."""
+        return self.submit(data).result()
+
+    def remove_batch(self, images):
+        """
+        Remove the backgrounds of `images` (a list of bytes), all queued at
+        once so every worker stays busy. Returns the cutouts in order; raises
+        the first error.
+        """
+        futures = [self.submit(data) for data in images]
+        return [future.result() for future in futures]
+
+    def _images_per_second(self):
+        busy = self._busy_seconds
+        if self._queued:
+            busy += time.perf_counter() - self._busy_since
+        return self.images / busy if busy else 0.0
+
+    def images_per_second(self):
+        """Images finished per second of the time any were queued, model loading included."""
+        with self._lock:
+            return self._images_per_second()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_remover():
+    """The process-wide BackgroundRemover, started on first use and stopped at exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BackgroundRemover()
+            atexit.register(_shared.close)
+        return _shared
+
+
+def remove_background(data):
+    """The image in `data` (PNG or JPEG bytes) as RGBA with its background removed, by the shared workers."""
+    return shared_remover().remove(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove the backgrounds of a batch of images.")
+    parser.add_argument("images", nargs="+", help="PNG or JPEG files")
+    parser.add_argument("--out", help="folder to save the cutouts in as PNG (default: don't save)")
+    parser.add_argument("--workers", type=int, default=REMBG_WORKERS, help="worker processes")
+    parser.add_argument("--model", default=REMBG_MODEL, help="rembg model")
+    args = parser.parse_args(argv)
+
+    remover = BackgroundRemover(args.workers, args.model)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    started = time.perf_counter()
+    futures = {}
+    for path in args.images:
+        with open(path, "rb") as f:
+            futures[remover.submit(f.read())] = path
+    first = None
+    failed = 0
+    for future in concurrent.futures.as_completed(futures):
+        path = futures[future]
+        first = first or time.perf_counter() - started
+        try:
+            cutout = future.result()
+        except Exception as e:
+            print(f"Error removing the background of {path}: {e}")
+            failed += 1
+            continue
+        if args.out:
+            cutout.save(os.path.join(args.out, f"{os.path.splitext(os.path.basename(path))[0]}.png"), "PNG")
+    wall = time.perf_counter() - started
+    remover.close()
+    print(f"{remover.images} images in {wall:.1f} s with {remover.workers} workers: "
+          f"{remover.images / wall:.2f} images/s (first after {first:.1f} s, loading the model included)"
+          + (f", {failed} failed" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
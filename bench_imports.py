@@ -0,0 +1,117 @@
+# bench_imports.py
+"""
+Import-time benchmark for the kiosk and controller processes.
+
+Imports each entry point in a fresh interpreter with `python -X importtime`,
+and fails (exit status 1) if any heavy dependency the kiosk must not load
+shows up, or if the import got slower than the saved baseline.
+
+    python bench_imports.py                   # check against bench_imports.json
+    python bench_imports.py --save-baseline   # record the current times as the baseline
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Entry point -> modules it imports at startup.
+TARGETS = {
+    "kiosk": "interface",
+    "controller": "controller",
+}
+
+# Packages only the Streamlit app and logo generation need.
+FORBIDDEN = ("streamlit", "openai", "pydantic", "rembg", "onnxruntime", "PIL", "requests", "numpy")
+
+# What a target can't avoid loading: `import pygame` loads numpy by itself whenever it's installed
+# (and rembg installs it), so the kiosk is only held to what it adds on top of pygame.
+ALLOWED_WITH = {
+    "kiosk": "pygame",
+}
+
+BASELINE_FILE = "bench_imports.json"
+
+
+def run_import(module, *options):
+    """Import `module` in a fresh interpreter; returns the finished process, whose stdout lists the top-level
+    packages that ended up in sys.modules."""
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    # Report what actually ended up in sys.modules: -X importtime also lists failed optional imports.
+    code = f"import sys, {module}; print(' '.join(sorted({{name.split('.')[0] for name in sys.modules}})))"
+    return subprocess.run([sys.executable, *options, "-c", code], capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_by(module):
+    """The top-level packages `import module` loads on its own."""
+    result = run_import(module)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return set(result.stdout.split())
+
+
+def measure(module, runs):
+    """Median import time of `module` in ms over `runs` fresh interpreters, and the top-level packages it loaded."""
+    times = []
+    loaded = set()
+    for _ in range(runs):
+        result = run_import(module, "-X", "importtime")
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or line.count("|") != 2:
+                continue
+            _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            if not cumulative_us.strip().isdigit():
+                continue
+            # Nested imports are indented; the target's own line is its cumulative import time.
+            if name == f" {module}":
+                times.append(int(cumulative_us) / 1000)
+        loaded.update(result.stdout.split())
+    return statistics.median(times), loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per target (median is used)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the measured times to {BASELINE_FILE}")
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), BASELINE_FILE)
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    failures = []
+    measured = {}
+    for target, module in TARGETS.items():
+        ms, loaded = measure(module, args.runs)
+        measured[target] = round(ms, 1)
+        line = f"{target:<11} import {module:<11} {ms:7.1f} ms"
+        if target in baseline:
+            line += f"  (baseline {baseline[target]:.1f} ms)"
+            if ms > baseline[target] * (1 + args.tolerance):
+                failures.append(f"{target} imports in {ms:.1f} ms, over {baseline[target]:.1f} ms + {args.tolerance:.0%}")
+        print(line)
+        if target in ALLOWED_WITH:
+            loaded -= loaded_by(ALLOWED_WITH[target])
+        heavy = sorted(loaded.intersection(FORBIDDEN))
+        if heavy:
+            failures.append(f"{target} imports {', '.join(heavy)}")
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(measured, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_FILE}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
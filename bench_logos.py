@@ -0,0 +1,152 @@
+# bench_logos.py
+"""
+Offline logo pipeline benchmark: starts a local stand-in for the OpenAI
+images API and the image host (fixed latencies, optional random failures),
+points the OpenAI client at it with OPENAI_BASE_URL and makes logos for a
+list of made-up cocktails at each concurrency, in a temporary folder.
+
+    python bench_logos.py                          # 12 logos, one at a time vs LOGO_CONCURRENCY
+    python bench_logos.py --fail-rate 0.2          # ... with 20% of requests failing with 500 or 429
+    python bench_logos.py --concurrency 1,2,4,8 --remove   # real background removal (needs rembg)
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import logos
+import background
+import thumbnails
+from settings import *
+
+
+def stand_in_image(size=1024):
+    """A PNG the size of a DALL-E 3 image: a drink-coloured disc on white."""
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (size, size), "white")
+    ImageDraw.Draw(image).ellipse((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(200, 60, 90))
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+class StandInServer:
+    """Answers image generation requests after `generate_latency` and image downloads after `download_latency`."""
+
+    def __init__(self, generate_latency, download_latency, fail_rate, seed=0):
+        self.image = stand_in_image()
+        self.requests = {"generate": 0, "download": 0, "failed": 0}
+        rng = random.Random(seed)
+        lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def fail(self, kind):
+                with lock:
+                    server.requests[kind] += 1
+                    failed = rng.random() < fail_rate
+                    status = rng.choice([429, 500, 503])
+                    if failed:
+                        server.requests["failed"] += 1
+                if failed:
+                    self.send_error(status)
+                return failed
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(generate_latency)
+                if self.path != "/v1/images/generations":
+                    self.send_error(404)
+                    return
+                if self.fail("generate"):
+                    return
+                with lock:
+                    number = server.requests["generate"]
+                body = json.dumps({"created": int(time.time()), "data": [
+                    {"url": f"http://127.0.0.1:{server.port}/images/{number}.png"}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(download_latency)
+                if not self.path.startswith("/images/"):
+                    self.send_error(404)
+                    return
+                if self.fail("download"):
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(server.image)))
+                self.end_headers()
+                self.wfile.write(server.image)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=12, help="logos to make per run")
+    parser.add_argument("--concurrency", default=f"1,{LOGO_CONCURRENCY}",
+                        help="comma-separated concurrency limits to compare")
+    parser.add_argument("--generate-latency", type=float, default=1.0, help="seconds per image generation request")
+    parser.add_argument("--download-latency", type=float, default=0.3, help="seconds per image download")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--backoff", type=float, default=0.1, help="first retry delay in seconds")
+    parser.add_argument("--remove", action="store_true", help="remove backgrounds with rembg (otherwise skipped)")
+    parser.add_argument("--verbose", action="store_true", help="list every logo's stage times")
+    args = parser.parse_args(argv)
+
+    server = StandInServer(args.generate_latency, args.download_latency, args.fail_rate)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stand-in")
+    folder = tempfile.mkdtemp(prefix="bench_logos_")
+    # Logos and thumbnails go to the temporary folder, not drink_logos and static/thumbnails.
+    logos.LOGO_FOLDER = folder
+    thumbnails.THUMBNAIL_FOLDER = os.path.join(folder, "thumbnails")
+    names = [f"Stand-in Cocktail {number + 1}" for number in range(args.count)]
+    print(f"Stand-in server on port {server.port}: generate {args.generate_latency:.2f} s, "
+          f"download {args.download_latency:.2f} s, {args.fail_rate:.0%} failures")
+    try:
+        for concurrency in [int(value) for value in args.concurrency.split(",")]:
+            for name in os.listdir(folder):
+                if name.endswith(".png"):
+                    os.remove(os.path.join(folder, name))
+            pipeline = logos.LogoPipeline(concurrency=concurrency, backoff=args.backoff,
+                                          remove=background.remove_background if args.remove else None)
+            started = time.perf_counter()
+            jobs = list(pipeline.run(names))
+            wall = time.perf_counter() - started
+            retries = sum(sum(job.attempts.values()) - len(job.attempts) for job in jobs)
+            print(f"concurrency {concurrency}: {logos.summarize(jobs, wall)}; {retries} retries, "
+                  f"{sum(job.ok for job in jobs) / wall:.2f} logos/s")
+            for job in jobs:
+                if args.verbose or not job.ok:
+                    print(f"    {job.describe()}")
+    finally:
+        server.close()
+        shutil.rmtree(folder, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# bench_pours.py
+"""
+Offline pour benchmark: runs every cocktail in cocktails.json (or a generated
+menu) through the real scheduler on a SimulatedBackend with a virtual clock,
+checks the recorded pin transitions against the plan and the current budget,
+and reports planned vs fixed-batch time per drink.
+
+    python bench_pours.py              # cocktails.json
+    python bench_pours.py --menu 200   # 200 random recipes from pump_config.json
+"""
+import io
+import sys
+import time
+import contextlib
+import random
+import argparse
+
+import controller
+import hardware
+import recipes
+from settings import *
+
+
+def generated_menu(size, seed=0):
+    rng = random.Random(seed)
+    ingredients = sorted(recipes.pump_index())
+    menu = []
+    for number in range(size):
+        picked = rng.sample(ingredients, rng.randint(1, min(5, len(ingredients))))
+        menu.append({
+            "normal_name": f"Generated {number + 1}",
+            "ingredients": {name: f"{rng.choice([0.25, 0.5, 0.75, 1, 1.5, 2, 3, 4])} oz" for name in picked},
+        })
+    return menu
+
+
+def check_order(sim, plan):
+    """Assert the simulated run matches `plan` and stayed inside the limits. Returns the run count."""
+    runs = sim.motor_runs(controller.MOTORS, INVERT_PUMP_PINS)
+    assert all(run.end is not None for run in runs), "a motor was left running"
+    assert len(runs) == len(plan.timeline), f"{len(runs)} motor runs for {len(plan.timeline)} planned pours"
+    timeline = sorted(plan.timeline, key=lambda planned: (planned.start, planned.pour.pump_index))
+    for run, planned in zip(runs, timeline):
+        assert abs((run.end - run.start) - planned.pour.seconds) < 0.01, f"pump {run.pump_index + 1} ran too long"
+    by_pump = {}
+    for run in runs:
+        previous = by_pump.get(run.pump_index)
+        assert previous is None or previous.end <= run.start, f"pump {run.pump_index + 1} started twice"
+        by_pump[run.pump_index] = run
+    assert sim.max_concurrent(controller.MOTORS, INVERT_PUMP_PINS) <= PUMP_CONCURRENCY, "too many pumps at once"
+    peak = sim.peak_current(controller.MOTORS, PUMP_CURRENT, PUMP_INRUSH_FACTOR, PUMP_INRUSH_SECONDS,
+                            INVERT_PUMP_PINS)
+    assert peak <= plan.budget + 1e-6 or len(plan.timeline) == 1, f"peak {peak:.2f} A over budget"
+    return len(runs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--menu", type=int, default=0, help="benchmark a generated menu of this many recipes")
+    parser.add_argument("--double", action="store_true", help="pour doubles")
+    parser.add_argument("--verbose", action="store_true", help="show the controller's per-pour output")
+    args = parser.parse_args(argv)
+
+    if args.menu:
+        menu = generated_menu(args.menu)
+    else:
+        menu = list(recipes.cocktails_by_name().values())
+    single_or_double = "double" if args.double else "single"
+
+    sim = hardware.SimulatedBackend()
+    controller.use_backend(sim)
+    planned_total = barrier_total = 0.0
+    pours = 0
+    output = sys.stdout if args.verbose else io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        for recipe in menu:
+            sim.reset()
+            executor_watcher = controller.make_drink(recipe, single_or_double)
+            if executor_watcher is None:
+                continue
+            executor_watcher.wait()
+            plan = executor_watcher.executors[0].result()
+            pours += check_order(sim, plan)
+            planned_total += plan.makespan
+            barrier_total += plan.barrier_makespan
+        wall = time.perf_counter() - started
+        controller.shutdown_scheduler()
+
+    print(f"{len(menu)} drinks, {pours} pours simulated in {wall * 1000:.0f} ms")
+    print(f"Planned pour time {planned_total:.0f} s vs {barrier_total:.0f} s in fixed batches "
+          f"({barrier_total - planned_total:.0f} s saved)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,10 +11,19 @@ if not DEBUG:
         print('Controller modules not found. Pump control will be disabled')
 import time
 import os
-import json
+import heapq
+import queue
+import itertools
+import collections
+import atexit
+import threading
 import concurrent.futures
 
 from settings import *
+import recipes
+import metrics
+import hardware
+from helpers import write_atomic
 
 # Define GPIO pins for each motor here (same as your test).
 # Adjust these if needed to match your hardware.
@@ -35,170 +44,940 @@ MOTORS = [
 
 ]
 
+FORWARD, REVERSE, STOP = "forward", "reverse", "stop"
+
+
+def default_backend():
+    """
+    The hardware backend picked by PUMP_BACKEND: 'gpio' (default), 'debug' or 'sim'.
+    Falls back to debug when RPi.GPIO isn't installed.
+    """
+    if PUMP_BACKEND == "sim":
+        return hardware.SimulatedBackend()
+    if DEBUG or PUMP_BACKEND == "debug":
+        return hardware.DebugBackend()
+    return hardware.GPIOBackend(GPIO)
+
+
+backend = default_backend()
+
+
+def use_backend(new_backend):
+    """
+    Switch to another hardware backend (e.g. a hardware.SimulatedBackend for
+    benchmarks). Shuts the running scheduler down first; the next order starts
+    a fresh one on the new backend and its clock.
+    """
+    global backend
+    shutdown_scheduler()
+    backend = new_backend
+
+
 def setup_gpio():
     """Set up all motor pins for OUTPUT."""
-    if DEBUG:
-        print("DEBUG: setup_gpio() called — Not actually initializing GPIO pins.")
-    else:
-        GPIO.setmode(GPIO.BCM)
-        for ia, ib in MOTORS:
-            GPIO.setup(ia, GPIO.OUT)
-            GPIO.setup(ib, GPIO.OUT)
+    backend.setup([pin for motor in MOTORS for pin in motor])
+
+
+def motor_levels(ia, ib, direction):
+    """The (pin, high) levels that put a motor into `direction` (FORWARD, REVERSE or STOP)."""
+    if direction == STOP:
+        return [(ia, False), (ib, False)]
+    ia_high = (direction == FORWARD) != INVERT_PUMP_PINS
+    return [(ia, ia_high), (ib, not ia_high)]
+
+
+def write_pins(levels):
+    """Write a batch of (pin, high) levels in a single backend call."""
+    backend.write(levels)
 
 
 def motor_forward(ia, ib):
     """Drive motor forward."""
-    if DEBUG:
-        print(f"DEBUG: motor_forward(ia={ia}, ib={ib}) called — No actual motor movement.")
-    else:
-        if INVERT_PUMP_PINS:
-            GPIO.output(ia, GPIO.LOW)
-            GPIO.output(ib, GPIO.HIGH)
-        else:
-            GPIO.output(ia, GPIO.HIGH)
-            GPIO.output(ib, GPIO.LOW)
+    write_pins(motor_levels(ia, ib, FORWARD))
 
 
 def motor_stop(ia, ib):
     """Stop motor."""
-    if DEBUG:
-        print(f"DEBUG: motor_stop(ia={ia}, ib={ib}) called — No actual motor movement.")
-    else:
-        GPIO.output(ia, GPIO.LOW)
-        GPIO.output(ib, GPIO.LOW)
-
-
-def motor_reverse(ia,ib):
-    if DEBUG:
-        print("Debug reverse")
-    else:
-        if INVERT_PUMP_PINS:
-            GPIO.output(ia,GPIO.HIGH)
-            GPIO.output(ib,GPIO.LOW)
-        else:
-            GPIO.output(ia,GPIO.LOW)
-            GPIO.output(ib,GPIO.HIGH)
+    write_pins(motor_levels(ia, ib, STOP))
+
+
+def motor_reverse(ia, ib):
+    write_pins(motor_levels(ia, ib, REVERSE))
 
 
 class Pour:
-    def __init__(self, pump_index, amount):
+    def __init__(self, pump_index, amount, ingredient=None, direction=FORWARD):
         self.pump_index = pump_index
         self.amount = amount
+        self.ingredient = ingredient
+        self.direction = direction
+        # Monotonic times the motor actually switched on and off, set by the DeadlineTimer.
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def seconds(self):
+        """How long the pump has to run to dispense `amount` oz."""
+        return self.amount * OZ_COEFFICIENT[self.pump_index]
+
+    @classmethod
+    def for_seconds(cls, pump_index, seconds, direction=FORWARD):
+        """A pour that runs the pump for a fixed time, e.g. to prime or clean a line."""
+        return cls(pump_index, seconds / OZ_COEFFICIENT[pump_index], direction=direction)
+
+    @property
+    def label(self):
+        return self.ingredient or f"Pump {self.pump_index + 1}"
+
+    @property
+    def run_seconds(self):
+        """How long the motor has actually run so far."""
+        if self.started_at is None:
+            return 0.0
+        stopped_at = self.stopped_at if self.stopped_at is not None else backend.clock.now()
+        return stopped_at - self.started_at
+
+    @property
+    def dispensed(self):
+        """Ounces actually dispensed, derived from how long the motor ran."""
+        return self.run_seconds / OZ_COEFFICIENT[self.pump_index]
+
+
+# Safety gap left between a pump stopping and another one starting in its place,
+# so timing jitter never lets both draw current at once.
+PLAN_GUARD_SECONDS = 0.05
+
+# The deadline timer sleeps until this close to a switch, then spins for precision.
+TIMER_SPIN_SECONDS = 0.002
+# Switches due this close together are written to the GPIO pins in one batch.
+TIMER_BATCH_SECONDS = 0.0005
+# Number of recent motor switches kept for jitter measurement.
+SWITCH_LOG_SIZE = 1000
+# Lead time between planning an order and its first motor start.
+ORDER_START_DELAY = 0.01
+# How often EMERGENCY_STOP_FILE is checked where inotify isn't available.
+EMERGENCY_STOP_POLL_SECONDS = 0.05
+
+PlannedPour = collections.namedtuple("PlannedPour", ["pour", "slot", "start", "end"])
 
-    def run(self):
-        ia, ib = MOTORS[self.pump_index]
-        seconds_to_pour = self.amount * OZ_COEFFICIENT[self.pump_index]
 
-        print(f'Pouring {self.amount} oz of Pump {self.pump_index} for {seconds_to_pour:.2f} seconds.')
-        motor_forward(ia, ib)
-        time.sleep(seconds_to_pour)
-        motor_stop(ia, ib)
+def pump_current(pump_index):
+    """Steady-state current draw of a pump in amps."""
+    return PUMP_CURRENT[pump_index]
 
 
-def prime_pumps(duration=10):
+def inrush_current(pump_index):
+    """Current a pump draws for the first PUMP_INRUSH_SECONDS after it starts."""
+    return PUMP_CURRENT[pump_index] * PUMP_INRUSH_FACTOR
+
+
+class PourPlan:
     """
-    Primes each pump for `duration` seconds in sequence (one after another).
+    Planned timeline for one order: when each pour starts and stops, in seconds
+    from the start of the order. `slot` is just a display lane (which of the
+    concurrently running pumps it is), not a fixed worker.
     """
-    setup_gpio()
-    try:
-        for index, (ia, ib) in enumerate(MOTORS, start=1):
-            print(f"Priming pump {index} for {duration} seconds...")
-            motor_forward(ia, ib)
-            time.sleep(duration)
-            motor_stop(ia, ib)
-    finally:
-        if not DEBUG:
-            GPIO.cleanup()
-        else:
-            print("DEBUG: prime_pumps() complete — no GPIO cleanup in debug mode.")
+
+    def __init__(self, timeline, slots, barrier_makespan, peak_current=0.0, budget=PUMP_CURRENT_BUDGET):
+        self.timeline = sorted(timeline, key=lambda planned: (planned.start, planned.slot))
+        self.slots = slots
+        self.barrier_makespan = barrier_makespan
+        self.peak_current = peak_current
+        self.budget = budget  # the current budget the plan was packed under
+
+    @property
+    def makespan(self):
+        return max((planned.end for planned in self.timeline), default=0.0)
+
+    @property
+    def saved_seconds(self):
+        """Wall-clock time saved compared to starting pours in fixed batches."""
+        return self.barrier_makespan - self.makespan
+
+    def describe(self):
+        lines = [f"{planned.start:6.2f}s - {planned.end:6.2f}s  slot {planned.slot + 1}: "
+                 f"{planned.pour.amount} oz from Pump {planned.pour.pump_index + 1}"
+                 for planned in self.timeline]
+        lines.append(f"Makespan {self.makespan:.2f}s (fixed batches: {self.barrier_makespan:.2f}s, "
+                     f"saved {self.saved_seconds:.2f}s), peak {self.peak_current:.2f} A "
+                     f"of {self.budget:.2f} A")
+        return "\n".join(lines)
 
 
-def clean_pumps(duration=10):
+def barrier_makespan(pours, slots=BARRIER_BATCH_SIZE):
+    """Duration of the old scheme: recipe-order batches of `slots`, each waiting for its longest pour."""
+    return sum(max(pour.seconds for pour in pours[i:i + slots]) for i in range(0, len(pours), slots))
+
+
+def _load_at(running, t):
+    """Total current drawn at time `t` by the (pour, start, end) entries in `running`."""
+    load = 0.0
+    for pour, start, end in running:
+        if start <= t < end:
+            in_inrush = t < start + PUMP_INRUSH_SECONDS
+            load += inrush_current(pour.pump_index) if in_inrush else pump_current(pour.pump_index)
+    return load
+
+
+def _pack_pours(ordered, budget, max_running):
+    """
+    Event-driven list scheduling: at each event, start every waiting pour (in
+    priority order) whose inrush fits under the remaining current budget.
+    Returns (timeline, peak_current).
+    """
+    waiting = list(ordered)
+    running = []  # (pour, start, end)
+    timeline = []
+    lanes = {}
+    peak = 0.0
+    t = 0.0
+    while waiting:
+        running = [entry for entry in running if entry[2] > t]
+        busy_pumps = {pour.pump_index for pour, _start, _end in running}
+        # Load only falls between events, so checking the instant of the start is enough.
+        load = _load_at(running, t)
+        for pour in list(waiting):
+            if len(running) >= max_running:
+                break
+            if pour.pump_index in busy_pumps:
+                continue
+            # A pump that can never fit the budget is started on its own rather than never.
+            if load + inrush_current(pour.pump_index) > budget and running:
+                continue
+            used_lanes = {lanes[id(entry[0])] for entry in running}
+            lane = next(lane for lane in range(len(running) + 1) if lane not in used_lanes)
+            entry = (pour, t, t + pour.seconds)
+            running.append(entry)
+            lanes[id(pour)] = lane
+            busy_pumps.add(pour.pump_index)
+            waiting.remove(pour)
+            load += inrush_current(pour.pump_index)
+            timeline.append(PlannedPour(pour, lane, t, t + pour.seconds))
+        peak = max(peak, load)
+        if not waiting:
+            break
+        # Advance to the next moment the load drops: a pour ending or an inrush window closing.
+        events = [end + PLAN_GUARD_SECONDS for _pour, _start, end in running]
+        events += [start + PUMP_INRUSH_SECONDS for _pour, start, _end in running
+                   if start + PUMP_INRUSH_SECONDS > t]
+        t = min(event for event in events if event > t)
+    return timeline, peak
+
+
+def plan_pours(pours, max_running=PUMP_CONCURRENCY, budget=None):
     """
-    Reverse each pump for `duration` seconds (one after another),
+    Schedule pours so the drink finishes as early as possible without the
+    pumps ever drawing more than `budget` amps (PUMP_CURRENT_BUDGET by default).
+
+    Each pump draws its PUMP_CURRENT figure, multiplied by PUMP_INRUSH_FACTOR for
+    the first PUMP_INRUSH_SECONDS after it starts, so starts get staggered while
+    running pumps settle. Whenever current frees up the next waiting pour starts,
+    longest first; shorter pours backfill gaps the longer ones can't use.
+    Both longest-first and heaviest-first priorities are tried and the plan with
+    the shorter makespan wins. At most `max_running` pumps ever run at once.
+    """
+    budget = PUMP_CURRENT_BUDGET if budget is None else budget
+    max_running = max(1, max_running)
+    priorities = [
+        sorted(pours, key=lambda pour: pour.seconds, reverse=True),
+        sorted(pours, key=lambda pour: (pump_current(pour.pump_index), pour.seconds), reverse=True),
+    ]
+    best = None
+    for ordered in priorities:
+        timeline, peak = _pack_pours(ordered, budget, max_running)
+        plan = PourPlan(timeline, max_running, barrier_makespan(pours), peak, budget)
+        if best is None or plan.makespan < best.makespan:
+            best = plan
+    return best
+
+
+def _maintenance_pours(direction, duration, pumps=None, durations=None):
+    """Pours for a prime or clean cycle: `pumps` (indexes, default all) for `duration` seconds each,
+    unless `durations` ({pump_index: seconds}) overrides it for a pump."""
+    pumps = range(len(MOTORS)) if pumps is None else pumps
+    durations = durations or {}
+    return [Pour.for_seconds(pump_index, durations.get(pump_index, duration), direction)
+            for pump_index in pumps if durations.get(pump_index, duration) > 0]
+
+
+def prime_pumps(duration=10, pumps=None, durations=None):
+    """
+    Primes the selected pumps (all by default) for `duration` seconds each.
+
+    Pumps run concurrently within the current budget, like the pours of a drink.
+    Returns an ExecutorWatcher straight away; use its `progress()` to follow the
+    cycle or `wait()` to block until it's done.
+    """
+    plan = plan_pours(_maintenance_pours(FORWARD, duration, pumps, durations))
+    print(f"Priming {len(plan.timeline)} pumps, about {plan.makespan:.0f} seconds...")
+    return get_scheduler().submit(run_plan, plan)
+
+
+def clean_pumps(duration=10, pumps=None, durations=None):
+    """
+    Reverse the selected pumps (all by default) for `duration` seconds each,
     e.g. for cleaning lines.
+
+    Pumps run concurrently within the current budget, like the pours of a drink.
+    Returns an ExecutorWatcher straight away; use its `progress()` to follow the
+    cycle or `wait()` to block until it's done.
     """
-    setup_gpio()
-    try:
-        for index, (ia, ib) in enumerate(MOTORS, start=1):
-            print(f"Reversing pump {index} for {duration} seconds (cleaning)...")
-            motor_reverse(ia, ib)
-            time.sleep(duration)
-            motor_stop(ia, ib)
-    finally:
-        if not DEBUG:
-            GPIO.cleanup()
-        else:
-            print("DEBUG: clean_pumps() complete no GPIO cleanup in debug mode.")
+    plan = plan_pours(_maintenance_pours(REVERSE, duration, pumps, durations))
+    print(f"Reversing {len(plan.timeline)} pumps (cleaning), about {plan.makespan:.0f} seconds...")
+    return get_scheduler().submit(run_plan, plan)
 
 
 class ExecutorWatcher:
+    """
+    Completion handle for a group of futures (e.g. the pours that make up a drink).
+
+    Callers can poll `done()`, block with `wait(timeout)`, register
+    `add_done_callback(fn)` or `await watcher` from asyncio code instead of spinning.
+    """
 
     def __init__(self):
         self.executors = []
+        self.order = None  # set when the watcher tracks a PumpScheduler Order
+        self._condition = threading.Condition()
+        self._callbacks = []
+
+    def add(self, future):
+        """Track another future; the watcher is done once every tracked future is."""
+        with self._condition:
+            self.executors.append(future)
+        future.add_done_callback(self._on_future_done)
+        return future
 
     def done(self):
-        if any([not executor.done() for executor in self.executors]):
-            return False
-        return True
+        with self._condition:
+            return all(executor.done() for executor in self.executors)
+
+    def wait(self, timeout=None):
+        """Block until every tracked future has finished. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(self.done, timeout)
+
+    def add_done_callback(self, fn):
+        """Call `fn(watcher)` once everything has finished (immediately if it already has)."""
+        with self._condition:
+            if not self.done():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _on_future_done(self, _future):
+        with self._condition:
+            self._condition.notify_all()
+            if not self.done():
+                return
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"ExecutorWatcher callback failed: {e}")
+
+    def progress(self):
+        """Progress of the tracked order (see Order.progress), or None if there isn't one."""
+        return self.order.progress() if self.order is not None else None
+
+    def __await__(self):
+        # Imported here: only asyncio callers need it, and it's slow to import on the kiosk.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(_watcher):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(self))
+
+        self.add_done_callback(resolve)
+        return future.__await__()
+
+
+ORDER_LATENCY = metrics.REGISTRY.histogram(
+    "tipsy_order_latency_seconds", "Time from a drink being ordered to its last motor stop.")
+QUEUE_WAIT = metrics.REGISTRY.histogram(
+    "tipsy_order_queue_wait_seconds", "Time orders spend queued behind other orders.")
+TIMER_OVERSHOOT = metrics.REGISTRY.histogram(
+    "tipsy_timer_overshoot_seconds", "How late motor switches happen after their deadline.",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+PUMP_RUN_SECONDS = metrics.REGISTRY.counter(
+    "tipsy_pump_run_seconds_total", "Seconds each pump has run.")
+PUMP_DUTY_CYCLE = metrics.REGISTRY.gauge(
+    "tipsy_pump_duty_cycle", "Fraction of the scheduler's uptime each pump has run.")
+DRINKS_POURED = metrics.REGISTRY.counter(
+    "tipsy_drinks_poured_total", "Drinks poured to completion.")
+DRINKS_PER_HOUR = metrics.REGISTRY.gauge(
+    "tipsy_drinks_last_hour", "Drinks finished in the last hour.")
+ORDERS_CANCELLED = metrics.REGISTRY.counter(
+    "tipsy_orders_cancelled_total", "Orders cancelled, including by emergency stop.")
+EMERGENCY_STOPS = metrics.REGISTRY.counter(
+    "tipsy_emergency_stops_total", "Emergency stops triggered.")
+EMERGENCY_STOP_LATENCY = metrics.REGISTRY.histogram(
+    "tipsy_emergency_stop_latency_seconds", "Time from emergency_stop() to every motor pin being low.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    "tipsy_queue_depth", "Orders waiting or in progress.")
+
+_drink_finish_times = collections.deque()
+
+
+def _record_pump_run(pour):
+    PUMP_RUN_SECONDS.inc(pour.run_seconds, pump=str(pour.pump_index + 1))
+
+
+def _collect_metrics():
+    scheduler = _scheduler
+    if scheduler is None:
+        return
+    now = scheduler.timer.clock.now()
+    QUEUE_DEPTH.set(scheduler.queue_depth())
+    uptime = now - scheduler.started_at
+    for pump_index in range(len(MOTORS)):
+        run_seconds = PUMP_RUN_SECONDS.value(pump=str(pump_index + 1))
+        PUMP_DUTY_CYCLE.set(run_seconds / uptime if uptime > 0 else 0.0, pump=str(pump_index + 1))
+    while _drink_finish_times and _drink_finish_times[0] < now - 3600:
+        _drink_finish_times.popleft()
+    DRINKS_PER_HOUR.set(len(_drink_finish_times))
 
 
-def pour_ingredients(ingredients, single_or_double, pump_config):
-    executor = concurrent.futures.ThreadPoolExecutor()
-    executor_watcher = ExecutorWatcher()
-    factor = 2 if single_or_double.lower() == "double" else 1
-    index = 1
-    for ingredient_name, measurement_str in ingredients.items():
-        parts = measurement_str.split()
-        if not parts:
-            print(f"Cannot parse measurement for {ingredient_name}. Skipping.")
-            continue
+metrics.REGISTRY.on_collect(_collect_metrics)
+
+
+def export_metrics():
+    """Write the metrics registry to METRICS_FILE, if one is configured."""
+    if not METRICS_FILE:
+        return
+    try:
+        metrics.REGISTRY.write(METRICS_FILE)
+    except Exception as e:
+        print(f"Error writing metrics to {METRICS_FILE}: {e}")
+
+
+SwitchRecord = collections.namedtuple("SwitchRecord", ["pump_index", "direction", "planned", "actual"])
+
+
+class DeadlineTimer:
+    """
+    One high-resolution thread that switches motors at monotonic deadlines.
+
+    Switches are kept in a heap; the thread sleeps on a condition variable until
+    TIMER_SPIN_SECONDS before the earliest deadline, then spins the rest of the
+    way. Switches due within TIMER_BATCH_SECONDS of each other are written in a
+    single GPIO call. Every switch is logged as a SwitchRecord (planned vs actual
+    monotonic time) in `switch_log`, so timer jitter can be measured.
+
+    All pin writes happen under the timer's lock, so `cancel()` and `stop_all()`
+    can switch motors off from the caller's thread without waiting for a deadline.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._running = {}  # pump_index -> Pour currently switched on
+        self.switch_log = collections.deque(maxlen=SWITCH_LOG_SIZE)
+        self._thread = threading.Thread(target=self._run, name="pump-timer", daemon=True)
+        self._thread.start()
+
+    def schedule(self, deadline, pour, direction):
+        """Switch the pump of `pour` to `direction` at monotonic time `deadline`. Returns a Future."""
+        future = concurrent.futures.Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Deadline timer has been shut down.")
+            heapq.heappush(self._heap, (deadline, next(self._sequence), pour, direction, future))
+            self._condition.notify()
+        return future
+
+    def schedule_many(self, switches):
+        """Schedule several (deadline, pour, direction) switches at once. Returns their Futures."""
+        futures = []
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Deadline timer has been shut down.")
+            for deadline, pour, direction in switches:
+                future = concurrent.futures.Future()
+                heapq.heappush(self._heap, (deadline, next(self._sequence), pour, direction, future))
+                futures.append(future)
+            self._condition.notify()
+        return futures
+
+    def cancel(self, pours):
+        """Drop every pending switch of `pours` and stop any of them that are running, right now."""
+        pours = set(map(id, pours))
+        with self._condition:
+            kept = []
+            dropped = []
+            for entry in self._heap:
+                (dropped if id(entry[2]) in pours else kept).append(entry)
+            heapq.heapify(kept)
+            self._heap = kept
+            running = [pour for pour in self._running.values() if id(pour) in pours]
+            self._stop_now(running, [MOTORS[pour.pump_index] for pour in running])
+            self._condition.notify()
+        _cancel_switches(dropped)
+
+    def stop_all(self):
+        """Emergency stop: drop every pending switch and drive every motor's pins low at once."""
+        with self._condition:
+            dropped, self._heap = self._heap, []
+            self._stop_now(list(self._running.values()), MOTORS)
+            self._condition.notify()
+        _cancel_switches(dropped)
+
+    def _stop_now(self, pours, motors):
+        if not motors:
+            return
+        levels = []
+        for ia, ib in motors:
+            levels += motor_levels(ia, ib, STOP)
+        write_pins(levels)
+        stopped_at = self.clock.now()
+        for pour in pours:
+            pour.stopped_at = stopped_at
+            self._running.pop(pour.pump_index, None)
+            _record_pump_run(pour)
+
+    def jitter(self):
+        """Lateness of logged switches in seconds: (mean, max)."""
+        lateness = [record.actual - record.planned for record in list(self.switch_log)]
+        if not lateness:
+            return 0.0, 0.0
+        return sum(lateness) / len(lateness), max(lateness)
+
+    def _wait_for_deadline(self):
+        """Sleep until just before the earliest deadline and return it (or None on shutdown)."""
+        with self._condition:
+            while True:
+                if not self._heap:
+                    if self._closed:
+                        return None
+                    self.clock.wait(self._condition)
+                    continue
+                wake_at = self._heap[0][0] - TIMER_SPIN_SECONDS
+                if self.clock.now() >= wake_at:
+                    return self._heap[0][0]
+                self.clock.wait(self._condition, wake_at)
+
+    def _run(self):
+        while True:
+            deadline = self._wait_for_deadline()
+            if deadline is None:
+                return
+            self.clock.spin_until(deadline)  # bounded by TIMER_SPIN_SECONDS
+            with self._condition:
+                # Switches may have been cancelled while we spun; only take what is still due.
+                due = []
+                while self._heap and self._heap[0][0] <= deadline + TIMER_BATCH_SECONDS:
+                    due.append(heapq.heappop(self._heap))
+                if due:
+                    self._switch(due)
+
+    def _switch(self, due):
+        levels = []
+        for _deadline, _sequence, pour, direction, _future in due:
+            ia, ib = MOTORS[pour.pump_index]
+            levels += motor_levels(ia, ib, direction)
+        try:
+            write_pins(levels)
+            error = None
+        except Exception as e:
+            print(f"Error switching pumps: {e}")
+            error = e
+        actual = self.clock.now()
+        for deadline, _sequence, pour, direction, future in due:
+            if error is None:
+                if direction == STOP:
+                    pour.stopped_at = actual
+                    self._running.pop(pour.pump_index, None)
+                    _record_pump_run(pour)
+                else:
+                    pour.started_at = actual
+                    self._running[pour.pump_index] = pour
+            self.switch_log.append(SwitchRecord(pour.pump_index, direction, deadline, actual))
+            TIMER_OVERSHOOT.observe(actual - deadline)
+            if error is None:
+                future.set_result(actual)
+            else:
+                future.set_exception(error)
+
+    def shutdown(self):
+        """Run every remaining switch (pumps always get their stop), then end the thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+
+def _cancel_switches(entries):
+    """
+    Cancel the Futures of dropped timer entries. Cancelling runs their done
+    callbacks on this thread, so callers do it after releasing their locks.
+    """
+    for entry in entries:
+        entry[4].cancel()
+
+
+class Order:
+    """A unit of work queued on the PumpScheduler: a drink, a prime or a clean cycle."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fn, args, kwargs):
+        self.id = next(Order._ids)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = concurrent.futures.Future()
+        self.submitted_at = backend.clock.now()
+        self.pours = []
+        self.plan = None
+        self.started_at = None  # monotonic time the plan's first switch is due
+        self.cancelled = threading.Event()
+
+    def progress(self):
+        """
+        Snapshot of how far along the order is:
+        {"pours": [{"label", "planned_seconds", "elapsed_seconds", "fraction"}, ...],
+         "fraction": overall 0..1, "eta_seconds": remaining seconds or None if not started,
+         "done": bool, "cancelled": bool}
+        """
+        pours = []
+        for pour in self.pours:
+            planned = pour.seconds
+            elapsed = min(pour.run_seconds, planned)
+            pours.append({
+                "label": pour.label,
+                "planned_seconds": planned,
+                "elapsed_seconds": elapsed,
+                "fraction": elapsed / planned if planned else 1.0,
+            })
+        done = self.future.done()
+        if done or self.plan is None or self.started_at is None:
+            eta = 0.0 if done else None
+            fraction = 1.0 if done else 0.0
+        else:
+            makespan = self.plan.makespan
+            elapsed = max(0.0, backend.clock.now() - self.started_at)
+            eta = max(0.0, makespan - elapsed)
+            fraction = min(elapsed / makespan, 1.0) if makespan else 1.0
+        return {
+            "pours": pours,
+            "fraction": fraction,
+            "eta_seconds": eta,
+            "done": done,
+            "cancelled": self.cancelled.is_set(),
+        }
+
+    def dispensed(self):
+        """{ingredient: ounces actually dispensed} for the pours this order has scheduled."""
+        report = {}
+        for pour in self.pours:
+            report[pour.label] = report.get(pour.label, 0.0) + pour.dispensed
+        return report
+
+
+def _format_report(report):
+    return ", ".join(f"{label} {ounces:.2f} oz" for label, ounces in report.items()) or "nothing"
+
+
+class PumpScheduler:
+    """
+    Long-lived owner of the GPIO session and of the threads that drive the pumps.
+
+    Orders (drinks, priming, cleaning) are queued and run one at a time on a
+    dedicated order thread, since there is only one glass under the spouts.
+    Every motor start and stop is driven by a single DeadlineTimer thread.
+    An emergency stop signalled by another process through EMERGENCY_STOP_FILE
+    stops this scheduler's motors and orders too.
+    Use `get_scheduler()` rather than constructing one directly.
+    """
+
+    def __init__(self):
+        self._orders = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = []
+        self._current = None
+        self._closed = False
+        setup_gpio()
+        self.timer = DeadlineTimer(backend.clock)
+        self.started_at = backend.clock.now()
+        self._order_thread = threading.Thread(target=self._run_orders, name="pump-orders", daemon=True)
+        self._order_thread.start()
+        self._stop_watcher = None
+        if EMERGENCY_STOP_FILE:
+            from filewatch import FileWatcher
+            self._stop_watcher = FileWatcher([EMERGENCY_STOP_FILE], self._on_stop_signal,
+                                             poll_seconds=EMERGENCY_STOP_POLL_SECONDS, quiet_seconds=0)
+
+    def _on_stop_signal(self, _paths):
         try:
-            oz_amount = float(parts[0])  # parse numeric
-        except ValueError:
-            print(f"Cannot parse numeric amount '{parts[0]}' for {ingredient_name}. Skipping.")
-            continue
-
-        oz_needed = oz_amount * factor
-
-        # find a matching pump label in pump_config
-        chosen_pump = None
-        for pump_label, config_ing_name in pump_config.items():
-            if config_ing_name.strip().lower() == ingredient_name.strip().lower():
-                chosen_pump = pump_label
+            with open(EMERGENCY_STOP_FILE) as f:
+                sender = int(f.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            return  # removed, or not a stop signal
+        if sender != os.getpid():  # this process has already stopped
+            print(f"Emergency stop from process {sender}.")
+            self.emergency_stop()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue an order `fn(*args, **kwargs)` and return an ExecutorWatcher for it."""
+        order = Order(fn, args, kwargs)
+        executor_watcher = ExecutorWatcher()
+        executor_watcher.order = order
+        executor_watcher.add(order.future)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Pump scheduler has been shut down.")
+            self._waiting.append(order)
+            self._orders.put(order)
+        return executor_watcher
+
+    def current_order(self):
+        with self._lock:
+            return self._current
+
+    def schedule_pours(self, timeline, order_start):
+        """
+        Schedule every PlannedPour of the current order relative to monotonic
+        time `order_start`, all in one go. Returns the Futures of the stop switches.
+        """
+        with self._lock:
+            order = self._current
+            if order is not None:
+                if order.cancelled.is_set():
+                    return []
+                order.pours.extend(planned.pour for planned in timeline)
+            switches = []
+            for planned in timeline:
+                start = order_start + planned.start
+                switches.append((start, planned.pour, planned.pour.direction))
+                switches.append((start + planned.pour.seconds, planned.pour, STOP))
+            return self.timer.schedule_many(switches)[1::2]
+
+    def queue_depth(self):
+        """Number of orders waiting or in progress."""
+        with self._lock:
+            return len(self._waiting) + (self._current is not None)
+
+    def cancel(self, order):
+        """
+        Cancel an order: drop it if it's still queued, or stop its running pumps now.
+        Returns {ingredient: ounces actually dispensed}.
+        """
+        with self._lock:
+            order.cancelled.set()
+            queued = order in self._waiting
+            if queued:
+                # The order thread skips orders that are no longer waiting.
+                self._waiting = [waiting for waiting in self._waiting if waiting is not order]
+            pours = list(order.pours)
+        if not queued:
+            self.timer.cancel(pours)
+        # Outside the lock: cancelling runs the watcher's done callbacks, which may call back in here.
+        order.future.cancel()
+        ORDERS_CANCELLED.inc()
+        report = order.dispensed()
+        print(f"Order {order.id} cancelled. Dispensed: {_format_report(report)}")
+        return report
+
+    def emergency_stop(self):
+        """
+        Switch every motor off immediately, then cancel the running and all queued orders.
+        Returns {ingredient: ounces actually dispensed} for the order that was running.
+        """
+        started = time.monotonic()
+        # Holding the lock keeps the order thread from starting the next order meanwhile.
+        with self._lock:
+            self.timer.stop_all()
+            latency = time.monotonic() - started
+            current = self._current
+            if current is not None:
+                current.cancelled.set()
+            cancelled, self._waiting = self._waiting, []
+            for order in cancelled:
+                order.cancelled.set()
+        ORDERS_CANCELLED.inc(len(cancelled) + (current is not None))
+        # Outside the lock: cancelling runs the watchers' done callbacks, which may call back in here.
+        for order in cancelled:
+            order.future.cancel()
+        EMERGENCY_STOPS.inc()
+        EMERGENCY_STOP_LATENCY.observe(latency)
+        report = current.dispensed() if current else {}
+        print(f"EMERGENCY STOP: all motors off in {latency * 1000:.2f} ms. Dispensed: {_format_report(report)}")
+        return report
+
+    def _run_orders(self):
+        while True:
+            order = self._orders.get()
+            if order is None:
                 break
+            with self._lock:
+                if order not in self._waiting:
+                    continue  # cancelled while queued
+                self._waiting.remove(order)
+                self._current = order
+            QUEUE_WAIT.observe(self.timer.clock.now() - order.submitted_at)
+            try:
+                if order.future.set_running_or_notify_cancel():
+                    try:
+                        order.future.set_result(order.fn(*order.args, **order.kwargs))
+                    except BaseException as e:
+                        print(f"Order failed: {e}")
+                        order.future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._current = None
+                export_metrics()
+
+    def shutdown(self, wait=True):
+        """Stop accepting orders, let queued ones finish and release the GPIO pins."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._orders.put(None)
+        if self._stop_watcher is not None:
+            self._stop_watcher.close()
+        if wait:
+            self._order_thread.join()
+        self.timer.shutdown()
+        backend.cleanup()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide PumpScheduler, starting it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PumpScheduler()
+            atexit.register(_scheduler.shutdown)
+            _start_metrics_server()
+        return _scheduler
+
+
+_metrics_server = None
+_metrics_exporter = None
+
+
+def _start_metrics_server():
+    global _metrics_server
+    if METRICS_PORT and _metrics_server is None:
+        try:
+            _metrics_server = metrics.REGISTRY.serve(METRICS_PORT)
+            print(f"Serving pour metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"Could not serve metrics on port {METRICS_PORT}: {e}")
+
+
+def _export_metrics_every(seconds):
+    while True:
+        time.sleep(seconds)
+        export_metrics()
+
+
+def start_metrics(export_seconds=METRICS_EXPORT_SECONDS):
+    """
+    Serve the metrics on METRICS_PORT now rather than with the first order, and
+    write METRICS_FILE every `export_seconds` (and at exit), for processes whose
+    metrics change between orders too, such as the kiosk's frame times.
+    """
+    global _metrics_exporter
+    with _scheduler_lock:
+        _start_metrics_server()
+        if METRICS_FILE and export_seconds > 0 and _metrics_exporter is None:
+            _metrics_exporter = threading.Thread(target=_export_metrics_every, args=(export_seconds,),
+                                                 name="metrics-export", daemon=True)
+            _metrics_exporter.start()
+            atexit.register(export_metrics)
+
+
+def shutdown_scheduler(wait=True):
+    """Shut down the process-wide PumpScheduler, if one was started."""
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.shutdown(wait=wait)
+
+
+def cancel(executor_watcher):
+    """
+    Cancel the order behind a watcher returned by make_drink (or prime/clean).
+    Returns {ingredient: ounces actually dispensed}.
+    """
+    if executor_watcher is None or executor_watcher.order is None:
+        return {}
+    return get_scheduler().cancel(executor_watcher.order)
 
-        if not chosen_pump:
-            print(f"No pump mapped to ingredient '{ingredient_name}'. Skipping.")
-            continue
 
-        # parse 'Pump 1' -> index=0
+def emergency_stop():
+    """
+    Stop every motor within milliseconds and cancel all queued and in-flight
+    orders, then signal every other process driving the pumps to do the same.
+    """
+    report = get_scheduler().emergency_stop()
+    if EMERGENCY_STOP_FILE:
         try:
-            pump_num_str = chosen_pump.replace("Pump", "").strip()
-            pump_index = int(pump_num_str) - 1
-        except ValueError:
-            print(f"Could not parse pump label '{chosen_pump}'. Skipping.")
-            continue
-
-        if pump_index < 0 or pump_index >= len(MOTORS):
-            print(f"Pump index {pump_index} out of range for '{ingredient_name}'. Skipping.")
-            continue
-
-        executor_watcher.executors.append(executor.submit(Pour(pump_index, oz_needed).run))
-
-        if index % PUMP_CONCURRENCY == 0:
-            while not executor_watcher.done():
-                pass
-        index += 1
-
-    while not executor_watcher.done():
-        pass
-    
-    if not DEBUG:
-        GPIO.cleanup()
-    else:
-        print("DEBUG: pour_ingredients() complete — no GPIO cleanup in debug mode.")
-        
+            write_atomic(EMERGENCY_STOP_FILE, f"{os.getpid()} {time.time()}\n")
+        except OSError as e:
+            print(f"Could not signal the emergency stop to other processes: {e}")
+    return report
+
+
+def compiled_pours(compiled):
+    """Pour objects for the pours of a recipes.CompiledRecipe."""
+    return [Pour(pour.pump_index, pour.ounces, pour.ingredient) for pour in compiled.pours]
+
+
+def run_plan(plan):
+    """
+    Order body: hand every start and stop of `plan` to the deadline timer and
+    return the plan once every pump has stopped (or the order was cancelled).
+    """
+    scheduler = get_scheduler()
+    executor_watcher = ExecutorWatcher()
+    order = scheduler.current_order()
+    order_start = scheduler.timer.clock.now() + ORDER_START_DELAY
+    if order is not None:
+        order.plan = plan
+        order.started_at = order_start
+
+    # The plan already respects the current budget, so everything can be queued up front.
+    for future in scheduler.schedule_pours(plan.timeline, order_start):
+        executor_watcher.add(future)
+
+    executor_watcher.wait()
+    return plan
+
+
+def pour_compiled(compiled):
+    """Pour a compiled recipe following its PourPlan and return the plan once every pump has stopped."""
+    plan = plan_pours(compiled_pours(compiled))
+    print(plan.describe())
+    run_plan(plan)
+
+    order = get_scheduler().current_order()
+    if order is not None and not order.cancelled.is_set():
+        finished = max((pour.stopped_at for pour in order.pours if pour.stopped_at is not None),
+                       default=backend.clock.now())
+        ORDER_LATENCY.observe(finished - order.submitted_at)
+        DRINKS_POURED.inc()
+        _drink_finish_times.append(finished)
+    return plan
+
+
+def plan_drink(recipe, single_or_double="single"):
+    """Return the PourPlan `make_drink` would follow for `recipe`, without pouring anything."""
+    return plan_pours(compiled_pours(recipes.compile_recipe(recipe, single_or_double)))
+
 
 def make_drink(recipe, single_or_double="single"):
     """
@@ -206,29 +985,23 @@ def make_drink(recipe, single_or_double="single"):
       1) a `recipe` dict from cocktails.json (with "ingredients": {...})
       2) single_or_double parameter (either "single" or "double").
 
+    The recipe is compiled (and cached) by `recipes`, then queued on the
+    process-wide PumpScheduler; the returned ExecutorWatcher completes once
+    it has been poured. Returns None if none of its ingredients are on a pump.
+
     In debug mode, only prints messages instead of driving motors.
     """
-    # 1) Load the pump config dictionary, e.g. {"Pump 1": "vodka", "Pump 2": "gin", ...}
     if not os.path.exists(CONFIG_FILE):
         print(f"pump_config file not found: {CONFIG_FILE}")
         return
 
-    try:
-        with open(CONFIG_FILE, "r") as f:
-            pump_config = json.load(f)
-    except Exception as e:
-        print(f"Error reading {CONFIG_FILE}: {e}")
-        return
-
-    # 2) Extract the recipe's ingredients
-    ingredients = recipe.get("ingredients", {})
-    if not ingredients:
+    if not recipe.get("ingredients"):
         print("No ingredients found in recipe.")
         return
 
-    setup_gpio()
-    executor = concurrent.futures.ThreadPoolExecutor()
-    executor_watcher = ExecutorWatcher()
-    executor_watcher.executors.append(executor.submit(pour_ingredients, ingredients, single_or_double, pump_config))
-
-    return executor_watcher
\ No newline at end of file
+    compiled = recipes.compile_recipe(recipe, single_or_double)
+    if not compiled.pours:
+        # Nothing maps to a pump: don't queue (and count) a drink that would pour nothing.
+        print(f"Nothing to pour for {compiled.name}: {' '.join(compiled.skipped)}")
+        return
+    return get_scheduler().submit(pour_compiled, compiled)
@@ -0,0 +1,175 @@
+# filewatch.py
+"""
+File change notifications for the kiosk.
+
+FileWatcher watches files and directories and calls `callback(paths)` from a
+background thread with the set of paths that changed, once writes have been
+quiet for a moment (saving the menu and generating its logos is a burst of
+writes). On Linux it blocks on inotify through ctypes and costs nothing while
+nothing changes; elsewhere, or if inotify is unavailable, it compares mtimes
+every FILE_POLL_SECONDS.
+"""
+import os
+import errno
+import ctypes
+import select
+import struct
+import threading
+import ctypes.util
+
+from settings import *
+
+# inotify(7) constants.
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len; then `len` bytes of name
+
+# Seconds without further writes before the changes are reported.
+QUIET_SECONDS = 0.25
+
+
+def _load_libc():
+    """The C library if it has inotify (Linux), else None."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+class FileWatcher:
+    """
+    Report changes to `paths` (files, or directories whose entries are
+    reported individually) by calling `callback(changed_paths)` on a
+    background thread. Use inotify when possible and poll mtimes otherwise.
+    """
+
+    def __init__(self, paths, callback, poll_seconds=FILE_POLL_SECONDS, quiet_seconds=QUIET_SECONDS):
+        self.callback = callback
+        self.poll_seconds = poll_seconds
+        self.quiet_seconds = quiet_seconds
+        self.files = {os.path.normpath(path) for path in paths if not os.path.isdir(path)}
+        self.directories = {os.path.normpath(path) for path in paths if os.path.isdir(path)}
+        self._stop_read, self._stop_write = os.pipe()
+        self._closed = threading.Event()
+        self._fd = self._inotify()
+        self.method = "inotify" if self._fd is not None else "poll"
+        self._thread = threading.Thread(target=self._run_inotify if self._fd is not None else self._run_poll,
+                                        name="file-watch", daemon=True)
+        self._thread.start()
+
+    def _inotify(self):
+        """An inotify descriptor watching every directory involved, or None to fall back to polling."""
+        libc = _load_libc()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            print(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling for changes")
+            return None
+        # Files are watched through their directory so atomic replaces (a rename over them) are seen too.
+        self._directories_by_wd = {}
+        for directory in self.directories | {os.path.dirname(path) or "." for path in self.files}:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                print(f"Can't watch {directory} ({os.strerror(ctypes.get_errno())}), polling for changes")
+                os.close(fd)
+                return None
+            self._directories_by_wd[wd] = directory
+        return fd
+
+    def _interesting(self, path):
+        return path in self.files or os.path.dirname(path) in self.directories
+
+    def _read_events(self):
+        """Changed watched paths from the queued inotify events; None if the queue overflowed."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if wd in self._directories_by_wd and name:
+                    path = os.path.normpath(os.path.join(self._directories_by_wd[wd], os.fsdecode(name)))
+                    if self._interesting(path):
+                        changed.add(path)
+
+    def _run_inotify(self):
+        pending = set()
+        while not self._closed.is_set():
+            # Sleep until something changes; once it has, until writes go quiet.
+            timeout = self.quiet_seconds if pending else None
+            ready, _, _ = select.select([self._fd, self._stop_read], [], [], timeout)
+            if self._stop_read in ready:
+                break
+            if self._fd in ready:
+                changed = self._read_events()
+                # On overflow, report everything and let the callback sort it out.
+                pending |= self.files | self.directories if changed is None else changed
+            elif pending:
+                self._report(pending)
+                pending = set()
+        os.close(self._fd)
+
+    def _snapshot(self):
+        """(mtime, size) of every watched file and every entry of the watched directories."""
+        snapshot = {}
+        for path in self.files:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        stat = entry.stat()
+                        snapshot[os.path.normpath(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+        return snapshot
+
+    def _run_poll(self):
+        previous = self._snapshot()
+        pending = set()
+        while not self._closed.wait(self.quiet_seconds if pending else self.poll_seconds):
+            current = self._snapshot()
+            changed = {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+            previous = current
+            if changed:
+                pending |= changed
+            elif pending:
+                self._report(pending)
+                pending = set()
+
+    def _report(self, changed):
+        try:
+            self.callback(changed)
+        except Exception as e:
+            print(f"Error handling changes to {', '.join(sorted(changed))}: {e}")
+
+    def close(self):
+        self._closed.set()
+        os.write(self._stop_write, b"x")
+        self._thread.join()
+        os.close(self._stop_read)
+        os.close(self._stop_write)
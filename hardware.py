@@ -0,0 +1,217 @@
+# hardware.py
+"""
+Pluggable pump hardware backends and the clocks that time them.
+
+* GPIOBackend drives the real pins through RPi.GPIO.
+* DebugBackend only prints what would happen.
+* SimulatedBackend records every pin transition against a clock; with a
+  VirtualClock a whole evening of pours runs in milliseconds, and the recorded
+  transitions can be checked for ordering, overlap and concurrency limits.
+"""
+import time
+import threading
+import collections
+
+Transition = collections.namedtuple("Transition", ["time", "pin", "high"])
+MotorRun = collections.namedtuple("MotorRun", ["pump_index", "direction", "start", "end"])
+
+
+class MonotonicClock:
+    """Real time, from time.monotonic()."""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, condition, deadline=None):
+        """Wait on `condition` (lock held by the caller) until notified or until `deadline`."""
+        if deadline is None:
+            return condition.wait()
+        return condition.wait(max(0.0, deadline - time.monotonic()))
+
+    def spin_until(self, deadline):
+        while time.monotonic() < deadline:
+            pass
+
+
+class VirtualClock:
+    """
+    Simulated time that jumps straight to whatever the caller is waiting for.
+    Waits without a timeout still block for real, so threads idle as usual.
+    """
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self):
+        with self._lock:
+            return self._now
+
+    def advance_to(self, deadline):
+        with self._lock:
+            self._now = max(self._now, deadline)
+
+    def sleep(self, seconds):
+        with self._lock:
+            self._now += max(0.0, seconds)
+
+    def wait(self, condition, deadline=None):
+        if deadline is None:
+            return condition.wait()
+        self.advance_to(deadline)
+        return False
+
+    def spin_until(self, deadline):
+        self.advance_to(deadline)
+
+
+class GPIOBackend:
+    """Real motor pins via RPi.GPIO."""
+
+    name = "gpio"
+
+    def __init__(self, gpio=None):
+        if gpio is None:
+            import RPi.GPIO as gpio
+        self.gpio = gpio
+        self.clock = MonotonicClock()
+
+    def setup(self, pins):
+        self.gpio.setmode(self.gpio.BCM)
+        for pin in pins:
+            self.gpio.setup(pin, self.gpio.OUT)
+
+    def write(self, levels):
+        """Write a batch of (pin, high) levels in a single GPIO call."""
+        self.gpio.output([pin for pin, _high in levels],
+                         [self.gpio.HIGH if high else self.gpio.LOW for _pin, high in levels])
+
+    def cleanup(self):
+        self.gpio.cleanup()
+
+
+class DebugBackend:
+    """No GPIO access, only prints what's happening."""
+
+    name = "debug"
+
+    def __init__(self):
+        self.clock = MonotonicClock()
+
+    def setup(self, pins):
+        print("DEBUG: setup_gpio() called — Not actually initializing GPIO pins.")
+
+    def write(self, levels):
+        print(f"DEBUG: write_pins({levels}) called — No actual motor movement.")
+
+    def cleanup(self):
+        print("DEBUG: cleanup() called — no GPIO cleanup in debug mode.")
+
+
+class SimulatedBackend:
+    """
+    Records every pin transition with a timestamp from `clock` (a VirtualClock
+    by default) instead of touching hardware.
+    """
+
+    name = "sim"
+
+    def __init__(self, clock=None):
+        self.clock = clock or VirtualClock()
+        self.transitions = []
+        self.levels = {}
+        self._lock = threading.Lock()
+
+    def setup(self, pins):
+        with self._lock:
+            for pin in pins:
+                self.levels.setdefault(pin, False)
+
+    def write(self, levels):
+        now = self.clock.now()
+        with self._lock:
+            for pin, high in levels:
+                if self.levels.get(pin) != high:
+                    self.transitions.append(Transition(now, pin, high))
+                self.levels[pin] = high
+
+    def cleanup(self):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.transitions = []
+
+    def motor_runs(self, motors, invert=False):
+        """Rebuild each motor run (pump, direction, start, end) from the pin transitions."""
+        pump_of = {}
+        for pump_index, (ia, ib) in enumerate(motors):
+            pump_of[ia] = pump_index
+            pump_of[ib] = pump_index
+        state = {pump_index: (False, False) for pump_index in range(len(motors))}
+        started = {}
+        runs = []
+
+        def direction_of(ia_high, ib_high):
+            if ia_high == ib_high:
+                return None
+            return "forward" if ia_high != invert else "reverse"
+
+        with self._lock:
+            transitions = list(self.transitions)
+        for transition in transitions:
+            pump_index = pump_of.get(transition.pin)
+            if pump_index is None:
+                continue
+            before = direction_of(*state[pump_index])
+            ia_high, ib_high = state[pump_index]
+            if transition.pin == motors[pump_index][0]:
+                ia_high = transition.high
+            else:
+                ib_high = transition.high
+            state[pump_index] = (ia_high, ib_high)
+            after = direction_of(ia_high, ib_high)
+            if after == before:
+                continue
+            if pump_index in started:
+                direction, start = started.pop(pump_index)
+                # Both pins of a motor change in one write; skip the zero-length in-between state.
+                if transition.time > start:
+                    runs.append(MotorRun(pump_index, direction, start, transition.time))
+            if after is not None:
+                started[pump_index] = (after, transition.time)
+        for pump_index, (direction, start) in started.items():
+            runs.append(MotorRun(pump_index, direction, start, None))
+        return sorted(runs, key=lambda run: (run.start, run.pump_index))
+
+    def max_concurrent(self, motors, invert=False):
+        """Largest number of motors that were running at the same instant."""
+        events = []
+        for run in self.motor_runs(motors, invert):
+            events.append((run.start, 1))
+            if run.end is not None:
+                events.append((run.end, -1))
+        running = peak = 0
+        # Stops sort before starts at the same instant.
+        for _time, change in sorted(events):
+            running += change
+            peak = max(peak, running)
+        return peak
+
+    def peak_current(self, motors, currents, inrush_factor=1.0, inrush_seconds=0.0, invert=False):
+        """Highest total current drawn, counting inrush for `inrush_seconds` after each start."""
+        runs = [run for run in self.motor_runs(motors, invert) if run.end is not None]
+        instants = {run.start for run in runs}
+        peak = 0.0
+        for t in instants:
+            load = 0.0
+            for run in runs:
+                if run.start <= t < run.end:
+                    in_inrush = t < run.start + inrush_seconds
+                    load += currents[run.pump_index] * (inrush_factor if in_inrush else 1.0)
+            peak = max(peak, load)
+        return peak
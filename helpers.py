@@ -1,11 +1,40 @@
 import os
+import sys
 import json
-import streamlit as st
+import threading
 from settings import *
-import assist
-import requests
-from rembg import remove
-from PIL import Image
+
+# The kiosk and controller only read JSON through this module, so Streamlit, OpenAI, rembg (onnxruntime),
+# PIL and requests are imported where they're used rather than here.
+
+
+def report_error(message):
+    """Show an error in the Streamlit app when running inside it, otherwise print it."""
+    if "streamlit" in sys.modules:
+        sys.modules["streamlit"].error(message)
+    else:
+        print(message)
+
+
+def read_json(path, default=None):
+    """The JSON in `path`, or `default` ({} if not given) when it's missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {} if default is None else default
+
+
+def write_atomic(path, data):
+    """
+    Write `data` (bytes or str) to `path` through a temporary file renamed
+    over it, so a reader (the kiosk, a metrics scraper) never sees half a file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
 
 
 def load_saved_config():
@@ -14,7 +43,7 @@ def load_saved_config():
             with open(CONFIG_FILE, "r") as f:
                 return json.load(f)
         except Exception as e:
-            st.error(f"Error loading configuration: {e}")
+            report_error(f"Error loading configuration: {e}")
     return {}
 
 
@@ -23,7 +52,7 @@ def save_config(data):
         with open(CONFIG_FILE, "w") as f:
             json.dump(data, f, indent=2)
     except Exception as e:
-        st.error(f"Error saving configuration: {e}")
+        report_error(f"Error saving configuration: {e}")
 
 
 def load_cocktails():
@@ -32,7 +61,7 @@ def load_cocktails():
             with open(COCKTAILS_FILE, "r") as f:
                 return json.load(f)
         except Exception as e:
-            st.error(f"Error loading cocktails: {e}")
+            report_error(f"Error loading cocktails: {e}")
     return {}
 
 
@@ -47,7 +76,7 @@ def save_cocktails(data, append=True):
                 cocktails = data
             json.dump(cocktails, f, indent=2)
     except Exception as e:
-        st.error(f"Error saving cocktails: {e}")
+        report_error(f"Error saving cocktails: {e}")
 
 
 def get_safe_name(name):
@@ -56,29 +85,13 @@ def get_safe_name(name):
 
 
 def generate_image(normal_name):
-    safe_cname = get_safe_name(normal_name)
-    filename = os.path.join(LOGO_FOLDER, f"{safe_cname}.png")
-
-    if os.path.exists(filename):
-        # If it already exists, skip generation
-        return filename
-    else:
-        prompt = (
-            f"A realistic illustration of a {normal_name} cocktail on a plain white background. "
-            "The lighting and shading create depth and realism, making the drink appear fresh and inviting."
-        )
-        try:
-            # 1) Generate the image URL
-            image_url = assist.generate_image(prompt)
-
-            # 2) Download + remove background in memory
-            img_data = requests.get(image_url).content
-            from io import BytesIO
-            with Image.open(BytesIO(img_data)).convert("RGBA") as original_img:
-                bg_removed = remove(original_img)
-                bg_removed.save(filename, "PNG")
-
-            return filename
-
-        except Exception as e:
-            pass
\ No newline at end of file
+    """
+    Make the logo for one cocktail (see logos.LogoPipeline) and return its
+    path, or None after reporting why it couldn't be made.
+    """
+    import logos
+    job, = logos.generate_logos([normal_name])
+    if not job.ok:
+        report_error(f"Couldn't make a logo for {job.describe()}")
+        return None
+    return job.path
@@ -1,176 +1,159 @@
 # interface.py
 import os
+import math
+import time
+import threading
 import pygame
 
+import metrics
+import recipes
 from settings import *
 from helpers import load_cocktails
-from controller import make_drink
+from filewatch import FileWatcher
+from menu import MenuManifest, VelocityTracker, flick_cards, flick_seconds, section_at
+from assets import (ASSET_LOAD_SECONDS, BUTTON_SIZE, INTERFACE_ART, AssetRegistry, RotationFrames, SurfaceCache,
+                    TextCache, cocktail_image_path, neighbours)
+from controller import make_drink, cancel, emergency_stop, export_metrics, start_metrics
+from tween import Tweener, Tween, Sequence, Parallel, Call, ease_out_quad
 
-def animate_text_zoom(screen, base_text, position, start_size, target_size, duration=300, background=None, current_img=None, image_offset=0):
-    """Animate overlay text zooming from a small size to target size."""
-    clock = pygame.time.Clock()
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(start_size + (target_size - start_size) * progress)
-        font = pygame.font.SysFont(None, current_size)
-        text_surface = font.render(base_text, True, (255, 255, 255))
-        text_rect = text_surface.get_rect(center=position)
-        if background:
-            screen.blit(background, (0, 0))
-        if current_img:
-            screen.blit(current_img, (image_offset, 0))
-        screen.blit(text_surface, text_rect)
-        pygame.display.flip()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
+# Fonts and rendered text shared by every drawing function.
+text_cache = TextCache()
 
-def animate_logo_zoom(screen, logo, rect, base_size, target_size, duration=300, background=None, current_img=None):
-    """Animate one logo zooming from base_size to target_size and back."""
-    clock = pygame.time.Clock()
-    center = rect.center
-    # Expand
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(base_size + (target_size - base_size) * progress)
-        scaled_img = pygame.transform.scale(logo, (current_size, current_size))
-        new_rect = scaled_img.get_rect(center=center)
-        if background:
-            screen.blit(background, (0, 0))
-        if current_img:
-            screen.blit(current_img, (0, 0))
-        screen.blit(scaled_img, new_rect)
-        pygame.display.flip()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
-    # Contract back
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(target_size - (target_size - base_size) * progress)
-        scaled_img = pygame.transform.scale(logo, (current_size, current_size))
-        new_rect = scaled_img.get_rect(center=center)
-        if background:
-            screen.blit(background, (0, 0))
-        if current_img:
-            screen.blit(current_img, (0, 0))
-        screen.blit(scaled_img, new_rect)
-        pygame.display.flip()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
+FRAME_SECONDS = metrics.REGISTRY.histogram(
+    "tipsy_frame_seconds", "Time to draw and present one interface frame.",
+    buckets=(0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.1, 0.25))
+FRAME_PIXELS = metrics.REGISTRY.counter(
+    "tipsy_frame_pixels_total", "Pixels sent to the display by interface frames.")
+PROCESS_CPU_SECONDS = metrics.REGISTRY.gauge(
+    "tipsy_process_cpu_seconds", "CPU time used by the interface process, pump threads included.")
+metrics.REGISTRY.on_collect(lambda: PROCESS_CPU_SECONDS.set(time.process_time()))
+STARTUP_SECONDS = metrics.REGISTRY.gauge(
+    "tipsy_interface_startup_seconds", "Time from run_interface() to the first frame on screen.")
+MENU_RELOADS = metrics.REGISTRY.counter(
+    "tipsy_menu_reloads_total", "Times the running interface reloaded cocktails.json, pump_config.json or logos.")
 
-def animate_logo_click(screen, logo, rect, base_size, target_size, duration=150, background=None, current_img=None):
-    """Animate a logo click (pop effect): grow from base_size to target_size then shrink back."""
-    clock = pygame.time.Clock()
-    center = rect.center
-    # Expand
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(base_size + (target_size - base_size) * progress)
-        scaled_img = pygame.transform.scale(logo, (current_size, current_size))
-        new_rect = scaled_img.get_rect(center=center)
-        if background:
-            screen.blit(background, (0, 0))
-        if current_img:
-            screen.blit(current_img, (0, 0))
-        screen.blit(scaled_img, new_rect)
-        pygame.display.flip()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
-    # Shrink back
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(target_size - (target_size - base_size) * progress)
-        scaled_img = pygame.transform.scale(logo, (current_size, current_size))
-        new_rect = scaled_img.get_rect(center=center)
-        if background:
-            screen.blit(background, (0, 0))
-        if current_img:
-            screen.blit(current_img, (0, 0))
-        screen.blit(scaled_img, new_rect)
-        pygame.display.flip()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
+POUR_DONE_EVENT = pygame.USEREVENT + 1
+MENU_CHANGED_EVENT = pygame.USEREVENT + 2
 
-def animate_both_logos_zoom(screen, single_logo, double_logo, single_rect, double_rect, base_size, target_size, duration=300, background=None, current_img=None):
-    """Animate both logos zooming in together and then shrinking back."""
-    clock = pygame.time.Clock()
-    center_single = single_rect.center
-    center_double = double_rect.center
-    # Expand
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(base_size + (target_size - base_size) * progress)
-        scaled_single = pygame.transform.scale(single_logo, (current_size, current_size))
-        scaled_double = pygame.transform.scale(double_logo, (current_size, current_size))
-        new_rect_single = scaled_single.get_rect(center=center_single)
-        new_rect_double = scaled_double.get_rect(center=center_double)
-        if background:
-            screen.blit(background, (0, 0))
-        if current_img:
-            screen.blit(current_img, (0, 0))
-        screen.blit(scaled_single, new_rect_single)
-        screen.blit(scaled_double, new_rect_double)
-        pygame.display.flip()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
-    # Contract
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        progress = min(elapsed / duration, 1.0)
-        current_size = int(target_size - (target_size - base_size) * progress)
-        scaled_single = pygame.transform.scale(single_logo, (current_size, current_size))
-        scaled_double = pygame.transform.scale(double_logo, (current_size, current_size))
-        new_rect_single = scaled_single.get_rect(center=center_single)
-        new_rect_double = scaled_double.get_rect(center=center_double)
-        if background:
-            screen.blit(background, (0, 0))
-        if current_img:
-            screen.blit(current_img, (0, 0))
-        screen.blit(scaled_single, new_rect_single)
-        screen.blit(scaled_double, new_rect_double)
-        pygame.display.flip()
-        if progress >= 1.0:
-            break
-        clock.tick(60)
+LOGO_SIZE = BUTTON_SIZE[0]  # single & double buttons are scaled to 75% of original
+TAP_DISTANCE = 10  # pixels a press may move and still count as a tap
+PROGRESS_BAR_HEIGHT = 16
+PROGRESS_ROW_HEIGHT = 30  # one row per ingredient on the pouring overlay
+PROGRESS_TEXT_SIZE = 28
+SCRUBBER_WIDTH = 44
+SCRUBBER_MIN_CARDS = 12  # smaller menus are quicker to swipe through than to scrub
+CONTROL_SIZE = (200, 64)  # on-screen Cancel and Stop All buttons shown while a drink pours
+CONTROL_MARGIN = 20
+CONTROL_TEXT_SIZE = 40
 
-def show_pouring_and_loading(screen, pouring_img, loading_img, watcher, background=None):
-    """Overlay pouring_img full screen and a spinning loading_img (720x720) drawn underneath."""
-    angle = 0
-    screen_size = screen.get_size()
-    screen_width, screen_height = screen_size
-    while True:
-        if watcher.done():
-            break
-        angle = (angle + 5) % 360
-        rotated_loading = pygame.transform.rotate(loading_img, angle)
-        rotated_rect = rotated_loading.get_rect(center=(screen_width // 2, screen_height // 2))
-        if background:
-            screen.blit(background, (0, 0))
-        # Draw loading image first (under)
-        screen.blit(rotated_loading, rotated_rect)
-        # Then draw pouring image on top
-        screen.blit(pouring_img, (0, 0))
+
+def present(screen, rects, started, kind):
+    """Show the frame drawn since `started`: only `rects` when DIRTY_RENDERING is on, else the whole screen."""
+    if DIRTY_RENDERING and rects is not None:
+        pygame.display.update(rects)
+        pixels = sum(rect.width * rect.height for rect in rects)
+    else:
         pygame.display.flip()
+        pixels = screen.get_width() * screen.get_height()
+    FRAME_SECONDS.observe(time.perf_counter() - started, kind=kind)
+    FRAME_PIXELS.inc(pixels, kind=kind)
+
+
+def logo_rect(rect, size):
+    """A square of side `size` centered on `rect`."""
+    scaled = pygame.Rect(0, 0, int(size), int(size))
+    scaled.center = rect.center
+    return scaled
+
+
+def sized(logo, size):
+    size = int(size)
+    if logo.get_width() == size:
+        return logo
+    return pygame.transform.scale(logo, (size, size))
+
+
+def pop(scene, attr, base_size, target_size, duration):
+    """Grow scene.attr to target_size, then shrink it back to base_size."""
+    return Sequence(Tween(scene, attr, target_size, duration), Tween(scene, attr, base_size, duration))
+
+
+def pour_progress(watcher):
+    """The watcher's progress (see controller.Order.progress), or an empty one before the order exists."""
+    progress = watcher.progress() if watcher is not None else None
+    return progress or {"pours": [], "fraction": 0.0, "eta_seconds": None, "done": False, "cancelled": False}
+
+
+def progress_panel_rect(screen, progress):
+    """Where draw_pour_progress draws: one row per ingredient plus the overall row, along the bottom."""
+    width, height = screen.get_size()
+    rows = len(progress["pours"]) + 1
+    return pygame.Rect(width // 10, height - (rows + 1) * PROGRESS_ROW_HEIGHT, width * 8 // 10, rows * PROGRESS_ROW_HEIGHT)
+
+
+def progress_signature(rect, progress):
+    """What draw_pour_progress would show, in pixels and whole seconds; redraw only when it changes."""
+    bar_width = rect.width * 6 // 10
+    eta = progress["eta_seconds"]
+    return (tuple(int(pour["fraction"] * bar_width) for pour in progress["pours"]),
+            int(progress["fraction"] * bar_width), None if eta is None else int(eta + 0.999))
+
+
+def draw_pour_progress(screen, rect, progress):
+    """A labelled bar per ingredient, then the whole drink's bar with the time left."""
+    label_width = rect.width * 4 // 10
+    bar_height = PROGRESS_ROW_HEIGHT // 2
+    rows = [(pour["label"], pour["fraction"]) for pour in progress["pours"]]
+    eta = progress["eta_seconds"]
+    rows.append(("Starting..." if eta is None else f"{int(eta + 0.999)} s left", progress["fraction"]))
+    for row, (label, fraction) in enumerate(rows):
+        top = rect.top + row * PROGRESS_ROW_HEIGHT
+        text_surface = text_cache.render(label, PROGRESS_TEXT_SIZE)
+        screen.blit(text_surface, text_surface.get_rect(midleft=(rect.left, top + PROGRESS_ROW_HEIGHT // 2)))
+        bar_rect = pygame.Rect(rect.left + label_width, top + (PROGRESS_ROW_HEIGHT - bar_height) // 2,
+                               rect.width - label_width, bar_height)
+        draw_progress_bar(screen, bar_rect, fraction)
+
+
+def draw_progress_bar(screen, rect, fraction):
+    radius = rect.height // 2
+    pygame.draw.rect(screen, (60, 60, 60), rect, border_radius=radius)
+    filled = rect.copy()
+    filled.width = int(rect.width * max(0.0, min(fraction, 1.0)))
+    if filled.width:
+        pygame.draw.rect(screen, (255, 255, 255), filled, border_radius=radius)
+
+
+def draw_control(screen, rect, label, color):
+    """A button: `label` on a rounded rectangle of `color`."""
+    pygame.draw.rect(screen, color, rect, border_radius=rect.height // 4)
+    text_surface = text_cache.render(label, CONTROL_TEXT_SIZE)
+    screen.blit(text_surface, text_surface.get_rect(center=rect.center))
+
+
+def draw_scrubber(screen, rect, sections, current):
+    """The section letters down `rect`, with `current` highlighted."""
+    row_height = rect.height / len(sections)
+    size = max(12, min(PROGRESS_TEXT_SIZE, int(row_height * 1.4)))
+    for row, section in enumerate(sections):
+        color = (255, 255, 255) if section == current else (140, 140, 140)
+        text_surface = text_cache.render(section, size, color)
+        screen.blit(text_surface, text_surface.get_rect(center=(rect.centerx, int(rect.top + (row + 0.5) * row_height))))
+
+
+class Scene:
+    """The animated state of the menu; tweens move these attributes and the main loop draws them."""
+
+    def __init__(self):
+        self.offset = 0.0  # horizontal card offset in pixels, from a drag or a swipe (many cards wide in a flick)
+        self.single_size = LOGO_SIZE
+        self.double_size = LOGO_SIZE
+
 
 def run_interface():
+    startup = time.perf_counter()
+    # Asset loading, startup and frame metrics are exported from the start, not only once a drink is poured.
+    start_metrics()
     pygame.init()
     if FULL_SCREEN:
         screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
@@ -180,252 +163,372 @@ def run_interface():
     screen_width, screen_height = screen_size
     pygame.display.set_caption("Cocktail Swipe")
 
-    def get_cocktail_image_path(cocktail):
-        """Given a Cocktail object, get the path to the image for that cocktail.
-        Image file name is assumed to be the normal_name in lower snake_case"""
-        file_name = f'{cocktail.get("normal_name", "").lower().replace(" ", "_")}.png'
-        path = os.path.join(LOGO_FOLDER, file_name)
-        return path
-
-    def load_cocktail_image(cocktail):
-        """Given a Cocktail object, load the image for that cocktail and scale it to the screen size"""
-        path = get_cocktail_image_path(cocktail)
-        try:
-            img = pygame.image.load(path)
-            img = pygame.transform.scale(img, screen_size)
-            return img
-        except Exception as e:
-            print(f"Error loading {path}: {e}")
+    # Static art is loaded, scaled and converted once, so a tap goes straight to the pour.
+    art = AssetRegistry()
+    for name, (path, size, alpha) in INTERFACE_ART.items():
+        art.register(name, path, size or screen_size, alpha)
+    print(f"Loaded interface art in {art.preload() * 1000:.0f} ms")
+    # The pouring spinner is pre-rotated once, in the background so the first frame doesn't wait;
+    # pouring then only blits cached frames.
+    spinner = RotationFrames(art.get("loading")) if art.get("loading") else None
+
+    def render_spinner():
+        seconds = spinner.render_all()
+        ASSET_LOAD_SECONDS.set(seconds, asset="spinner_frames")
+        print(f"Rendered {spinner.count} spinner frames ({spinner.nbytes() / 1e6:.1f} MB) in {seconds * 1000:.0f} ms")
+
+    if spinner:
+        threading.Thread(target=render_spinner, name="spinner-frames", daemon=True).start()
+
+    card_cache = SurfaceCache(screen_size)
 
     def load_cocktail(index):
-        """Load a cocktail based on a provided index. Also pre-load the images for the previous and next cocktails"""
+        """Load a cocktail based on a provided index, with the images for the previous and next cocktails.
+        The cards further out in both directions are prefetched in the background."""
         current_cocktail = cocktails[index]
-        current_image = load_cocktail_image(current_cocktail)
+        current_image = card_cache.get(cocktail_image_path(current_cocktail))
         current_cocktail_name = current_cocktail.get('normal_name', '')
-        previous_cocktail = cocktails[(index - 1) % len(cocktails)]
-        previous_image = load_cocktail_image(previous_cocktail)
-        next_cocktail = cocktails[(index + 1) % len(cocktails)]
-        next_image = load_cocktail_image(next_cocktail)
+        previous_image = card_cache.get(cocktail_image_path(cocktails[(index - 1) % len(cocktails)]))
+        next_image = card_cache.get(cocktail_image_path(cocktails[(index + 1) % len(cocktails)]))
+        card_cache.prefetch([cocktail_image_path(cocktails[i])
+                             for i in neighbours(index, len(cocktails), PREFETCH_CARDS)])
         return current_cocktail, current_image, current_cocktail_name, previous_image, next_image
 
-    cocktail_data = load_cocktails().get('cocktails', [])
+    def card_image(step):
+        """The card `step` places from the current one. Cards past the neighbours are drawn only once
+        decoded, so a flick across the menu never waits on one."""
+        if step == 0:
+            return current_image
+        if step in (-1, 1):
+            return next_image if step == 1 else previous_image
+        return card_cache.get(cocktail_image_path(cocktails[(current_index + step) % len(cocktails)]), load=False)
 
-    # Load the static background image (tipsy.png)
-    try:
-        background = pygame.image.load("./tipsy.png")
-        background = pygame.transform.scale(background, screen_size)
-    except Exception as e:
-        print("Error loading background image (tipsy.png):", e)
-        background = None
-    
-    cocktails = []
+    background = art.get("background")
 
-    for cocktail in cocktail_data:
-        if os.path.exists(get_cocktail_image_path(cocktail)):
-            cocktails.append(cocktail)
+    # Built once from cocktails.json and one scan of the logo folder; hot reloads update it in place.
+    cocktails = MenuManifest.load()
 
     if not cocktails:
         print("No valid cocktails found in cocktails.json")
+        card_cache.close()
         pygame.quit()
         return
-    
+
     current_index = 0
 
     current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
 
-    # Load single & double buttons and scale them to 75% of original (base size: 150x150)
-    try:
-        single_logo = pygame.image.load("single.png")
-        single_logo = pygame.transform.scale(single_logo, (150, 150))
-    except Exception as e:
-        print("Error loading single.png:", e)
-        single_logo = None
-    try:
-        double_logo = pygame.image.load("double.png")
-        double_logo = pygame.transform.scale(double_logo, (150, 150))
-    except Exception as e:
-        print("Error loading double.png:", e)
-        double_logo = None
+    single_logo = art.get("single")
+    double_logo = art.get("double")
+    pouring_img = art.get("pouring")
 
     # Position extra logos: single on left, double on right, spaced more toward edges.
     margin = 50  # adjust as needed for spacing
-    single_rect = pygame.Rect(margin, (screen_height - 150) // 2, 150, 150)
-    double_rect = pygame.Rect(screen_width - margin - 150, (screen_height - 150) // 2, 150, 150)
+    single_rect = pygame.Rect(margin, (screen_height - LOGO_SIZE) // 2, LOGO_SIZE, LOGO_SIZE)
+    double_rect = pygame.Rect(screen_width - margin - LOGO_SIZE, (screen_height - LOGO_SIZE) // 2, LOGO_SIZE, LOGO_SIZE)
+
+    normal_text_size = 72
+    text_position = (screen_width // 2, int(screen_height * 0.85))
+
+    # Pour progress: per ingredient on the pouring overlay, and as a thin strip on top of the menu.
+    spinner_center = (screen_width // 2, screen_height // 2)
+    menu_bar_rect = pygame.Rect(0, 0, screen_width, PROGRESS_BAR_HEIGHT // 2)
+    # Letter index down the right edge, for menus too long to swipe through.
+    scrubber_rect = pygame.Rect(screen_width - SCRUBBER_WIDTH, PROGRESS_BAR_HEIGHT,
+                                SCRUBBER_WIDTH, screen_height - 2 * PROGRESS_BAR_HEIGHT)
+    # While a drink pours: Stop All (every pump, on the menu too) top left, Cancel (this drink, on the
+    # pouring overlay) top right. A touchscreen has no Escape key.
+    stop_rect = pygame.Rect((CONTROL_MARGIN, PROGRESS_BAR_HEIGHT + CONTROL_MARGIN), CONTROL_SIZE)
+    cancel_rect = pygame.Rect((screen_width - CONTROL_MARGIN - CONTROL_SIZE[0], PROGRESS_BAR_HEIGHT + CONTROL_MARGIN),
+                              CONTROL_SIZE)
 
+    scene = Scene()
+    tweener = Tweener()
+    pour = None  # watcher of the drink being shown, while it pours
+    overlay = False  # whether the pouring overlay covers the menu
     dragging = False
     drag_start_x = 0
-    drag_offset = 0
+    drag_velocity = VelocityTracker()
+    scrubbing = False
     clock = pygame.time.Clock()
 
-    normal_text_size = 72  
-    text_position = (screen_width // 2, int(screen_height * 0.85))
+    def show_card(index):
+        nonlocal current_index, current_cocktail, current_image, current_cocktail_name, previous_image, next_image
+        current_index = index
+        current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
+        scene.offset = 0
+
+    def show_scrubber():
+        return len(cocktails) >= SCRUBBER_MIN_CARDS and len(cocktails.sections) > 1
+
+    def scrub_to(y):
+        """Jump straight to the first cocktail under the letter at height `y` on the scrubber."""
+        index = cocktails.section_start(section_at(cocktails.sections, scrubber_rect.top, scrubber_rect.height, y))
+        if index != current_index:
+            tweener.cancel("card")
+            show_card(index)
+
+    def finish_swipe(step):
+        # A step rather than an index, so a menu reloaded mid-swipe still lands next to the card it left.
+        show_card((current_index + step) % len(cocktails))
+        # Animate both extra logos zooming together.
+        if single_logo and double_logo:
+            tweener.start(Parallel(pop(scene, "single_size", LOGO_SIZE, 175, 0.3),
+                                   pop(scene, "double_size", LOGO_SIZE, 175, 0.3)), key="logos")
+
+    def order(single_or_double, size_attr):
+        """Start pouring the current cocktail and pop its button; the pouring overlay follows the pop."""
+        nonlocal pour
+
+        def show_overlay():
+            nonlocal overlay
+            overlay = pour is watcher and bool(pouring_img and spinner)
+
+        watcher = make_drink(current_cocktail, single_or_double)
+        tweener.start(Sequence(pop(scene, size_attr, LOGO_SIZE, 220, 0.15), Call(show_overlay)), key=size_attr)
+        if watcher is None:
+            return
+        pour = watcher
+        # The controller posts an event when the pour finishes, so the loop never polls the watcher.
+        watcher.add_done_callback(lambda done: pygame.event.post(pygame.event.Event(POUR_DONE_EVENT, watcher=done)))
 
+    def release(pos):
+        """Handle the end of a press: a tap on a button or the overlay, or the end of a swipe."""
+        moved = pos[0] - drag_start_x
+        if overlay:
+            # Only the Cancel button cancels the drink; a stray tap on the overlay does nothing.
+            if abs(moved) < TAP_DISTANCE and cancel_rect.collidepoint(pos):
+                cancel(pour)
+            return
+        if abs(moved) < TAP_DISTANCE:
+            scene.offset = 0
+            if single_rect.collidepoint(pos):
+                order('single', "single_size")
+            elif double_rect.collidepoint(pos):
+                order('double', "double_size")
+            return
+        # A flick coasts as many cards as its speed carries it; a slow drag moves one card if it went far enough.
+        velocity = drag_velocity.velocity()
+        cards = flick_cards(velocity, screen_width, min(FLICK_MAX_CARDS, max(1, len(cocktails) - 1)))
+        if cards:
+            step = cards if velocity < 0 else -cards
+        elif abs(scene.offset) > screen_width / 4:
+            step = 1 if scene.offset < 0 else -1
+        else:
+            # Snap back if the swipe is insufficient.
+            tweener.start(Tween(scene, "offset", 0, 0.3), key="card")
+            return
+        target_offset = -step * screen_width
+        if abs(step) > 1:
+            slide = Tween(scene, "offset", target_offset, flick_seconds(target_offset - scene.offset, velocity),
+                          ease_out_quad)
+            # Decode where the flick lands while it's on its way.
+            landing = (current_index + step) % len(cocktails)
+            card_cache.prefetch([cocktail_image_path(cocktails[i])
+                                 for i in [landing] + neighbours(landing, len(cocktails), 1)])
+        else:
+            slide = Tween(scene, "offset", target_offset, 0.3)
+        tweener.start(Sequence(slide, Call(lambda: finish_swipe(step))), key="card")
+
+    def reload_menu(paths):
+        """Apply changes to the menu files, staying on the card being shown (and mid-swipe, if swiping)."""
+        nonlocal cocktails
+        started = time.perf_counter()
+        MENU_RELOADS.inc()
+        if os.path.normpath(CONFIG_FILE) in paths:
+            # Compile against the new pump mapping now rather than on the next tap.
+            print(f"Pump configuration changed: {len(recipes.pump_index())} ingredients on pumps")
+        # Only logos that changed are decoded again; every other card stays cached.
+        changed_logos = {os.path.join(LOGO_FOLDER, os.path.basename(path)) for path in paths
+                         if os.path.dirname(path) == os.path.normpath(LOGO_FOLDER)}
+        card_cache.discard(changed_logos)
+        cocktails_changed = os.path.normpath(COCKTAILS_FILE) in paths
+        if not cocktails_changed and not changed_logos:
+            return
+        updated = cocktails.updated(load_cocktails().get('cocktails', []) if cocktails_changed else None, changed_logos)
+        if not updated:
+            print("No valid cocktails found in cocktails.json, keeping the current menu")
+            return
+        names, previous_names = set(updated.names()), set(cocktails.names())
+        index = updated.index_of(current_cocktail_name, min(current_index, len(updated) - 1))
+        cocktails = updated
+        show_card(index)
+        print(f"Reloaded menu in {(time.perf_counter() - started) * 1000:.0f} ms: {len(cocktails)} cocktails, "
+              f"{len(names - previous_names)} new, {len(previous_names - names)} removed, "
+              f"{len(changed_logos)} logos changed")
+
+    def draw_menu():
+        if background:
+            screen.blit(background, (0, 0))
+        else:
+            screen.fill((0, 0, 0))
+        # The two cards in view: the current one and a neighbour while swiping, any two during a flick.
+        travel = -scene.offset / screen_width
+        first = math.floor(travel)
+        left = int((first - travel) * screen_width)
+        for step, x in ((first, left), (first + 1, left + screen_width)):
+            image = card_image(step)
+            if image and x < screen_width:
+                screen.blit(image, (x, 0))
+        name = current_cocktail_name
+        if abs(travel) >= 1:
+            # Name the card passing the middle once a flick has left the current one.
+            name = cocktails[(current_index + round(travel)) % len(cocktails)].get('normal_name', '')
+        text_surface = text_cache.render(name, normal_text_size)
+        text_rect = text_surface.get_rect(center=text_position)
+        screen.blit(text_surface, text_rect)
+        if single_logo:
+            screen.blit(sized(single_logo, scene.single_size), logo_rect(single_rect, scene.single_size))
+        if double_logo:
+            screen.blit(sized(double_logo, scene.double_size), logo_rect(double_rect, scene.double_size))
+        if show_scrubber():
+            draw_scrubber(screen, scrubber_rect, cocktails.sections, cocktails.section_of(current_index))
+        if pour is not None:
+            draw_progress_bar(screen, menu_bar_rect, progress["fraction"])
+            draw_control(screen, stop_rect, "Stop All", (200, 30, 30))
+
+    def draw_overlay(frame_index, spinner_rect, panel_rect):
+        if background:
+            screen.blit(background, (0, 0))
+        else:
+            screen.fill((0, 0, 0))
+        # Draw loading image first (under), then the pouring image on top
+        screen.blit(spinner.frame(frame_index)[0], spinner_rect)
+        screen.blit(pouring_img, (0, 0))
+        draw_pour_progress(screen, panel_rect, progress)
+        draw_control(screen, stop_rect, "Stop All", (200, 30, 30))
+        draw_control(screen, cancel_rect, "Cancel", (90, 90, 90))
+
+    # Recipes added and pumps remapped in the app show up without restarting the kiosk.
+    menu_watcher = None
+    if HOT_RELOAD:
+        menu_watcher = FileWatcher(
+            [COCKTAILS_FILE, CONFIG_FILE, LOGO_FOLDER],
+            lambda paths: pygame.event.post(pygame.event.Event(MENU_CHANGED_EVENT, paths=paths)))
+        print(f"Watching {COCKTAILS_FILE}, {CONFIG_FILE} and {LOGO_FOLDER} for changes ({menu_watcher.method})")
+
+    drawn = {}  # name -> (rect, what was shown) of each moving part as last drawn
+    overlay_drawn = None
+    progress = None
+    full_redraw = True
     running = True
     while running:
-        for event in pygame.event.get():
+        if DIRTY_RENDERING and not dragging and not tweener.running() and not full_redraw:
+            # Nothing on screen is moving: sleep until the next input, or until the pour
+            # display is due for its next spinner frame.
+            if pour is None:
+                events = [pygame.event.wait()]
+            else:
+                next_frame = (int(time.monotonic() * SPINNER_FPS) + 1) / SPINNER_FPS
+                events = [pygame.event.wait(max(1, int((next_frame - time.monotonic()) * 1000)))]
+            events += pygame.event.get()
+        else:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
-            if event.type == pygame.KEYDOWN:
+            elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_q:
                     running = False
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                dragging = True
-                drag_start_x = event.pos[0]
-            if event.type == pygame.MOUSEMOTION and dragging:
-                current_x = event.pos[0]
-                drag_offset = current_x - drag_start_x
-            if event.type == pygame.MOUSEBUTTONUP and dragging:
-                # If it's a click (minimal drag), check extra logos.
-                if abs(drag_offset) < 10:
-                    pos = event.pos
-                    if single_rect.collidepoint(pos):
-                        # Animate single logo click
-                        if single_logo:
-                            animate_logo_click(screen, single_logo, single_rect, base_size=150, target_size=220, duration=150, background=background, current_img=current_image)
-                        try:
-                            pouring_img = pygame.image.load("pouring.png")
-                            pouring_img = pygame.transform.scale(pouring_img, screen_size)
-                        except Exception as e:
-                            print("Error loading pouring.png:", e)
-                            pouring_img = None
-                        try:
-                            loading_img = pygame.image.load("loading.png")
-                            loading_img = pygame.transform.scale(loading_img, (720,720))
-                        except Exception as e:
-                            print("Error loading loading.png:", e)
-                            loading_img = None
-
-                        executor_watcher = make_drink(current_cocktail, 'single')
-
-                        if pouring_img and loading_img:
-                            show_pouring_and_loading(screen, pouring_img, loading_img, watcher=executor_watcher, background=background)
-
-                    elif double_rect.collidepoint(pos):
-                        # Animate double logo click
-                        if double_logo:
-                            animate_logo_click(screen, double_logo, double_rect, base_size=150, target_size=220, duration=150, background=background, current_img=current_image)
-                        try:
-                            pouring_img = pygame.image.load("pouring.png")
-                            pouring_img = pygame.transform.scale(pouring_img, screen_size)
-                        except Exception as e:
-                            print("Error loading pouring.png:", e)
-                            pouring_img = None
-                        try:
-                            loading_img = pygame.image.load("loading.png")
-                            loading_img = pygame.transform.scale(loading_img, (720,720))
-                        except Exception as e:
-                            print("Error loading loading.png:", e)
-                            loading_img = None
-
-                        executor_watcher = make_drink(current_cocktail, 'double')
-
-                        if pouring_img and loading_img:
-                            show_pouring_and_loading(screen, pouring_img, loading_img, watcher=executor_watcher, background=background)
-                        
-                    dragging = False
-                    drag_offset = 0
-                    continue  # Skip further swipe handling.
-                # Otherwise, it's a swipe.
-                if abs(drag_offset) > screen_width / 4:
-                    if drag_offset < 0:
-                        target_offset = -screen_width
-                        new_index = (current_index + 1) % len(cocktails)
-                    else:
-                        target_offset = screen_width
-                        new_index = (current_index - 1) % len(cocktails)
-                    start_offset = drag_offset
-                    duration = 300
-                    start_time = pygame.time.get_ticks()
-                    while True:
-                        elapsed = pygame.time.get_ticks() - start_time
-                        progress = min(elapsed / duration, 1.0)
-                        current_offset = start_offset + (target_offset - start_offset) * progress
-                        if background:
-                            screen.blit(background, (0, 0))
-                        else:
-                            screen.fill((0, 0, 0))
-                        screen.blit(current_image, (current_offset, 0))
-                        if drag_offset < 0:
-                            screen.blit(next_image, (screen_width + current_offset, 0))
-                        else:
-                            screen.blit(previous_image, (-screen_width + current_offset, 0))
-                        # Draw overlay text at normal size.
-                        font = pygame.font.SysFont(None, normal_text_size)
-                        drink_name = current_cocktail_name
-                        text_surface = font.render(drink_name, True, (255, 255, 255))
-                        text_rect = text_surface.get_rect(center=text_position)
-                        screen.blit(text_surface, text_rect)
-                        # Draw extra logos at their current (base) size.
-                        if single_logo:
-                            screen.blit(single_logo, single_rect)
-                        if double_logo:
-                            screen.blit(double_logo, double_rect)
-                        pygame.display.flip()
-                        if progress >= 1.0:
-                            break
-                        clock.tick(60)
-                    current_index = new_index
-                    current_cocktail, current_image, current_cocktail_name, previous_image, next_image = load_cocktail(current_index)
-
-                    # Animate both extra logos zooming together.
-                    if single_logo and double_logo:
-                        animate_both_logos_zoom(screen, single_logo, double_logo, single_rect, double_rect, base_size=150, target_size=175, duration=300, background=background, current_img=current_image)
+                elif event.key == pygame.K_ESCAPE:
+                    # Escape stops every pump.
+                    emergency_stop()
+            elif event.type == POUR_DONE_EVENT:
+                if event.watcher is pour:
+                    pour = None
+                    overlay = False
+                    full_redraw = True
+            elif event.type == MENU_CHANGED_EVENT:
+                reload_menu(event.paths)
+                full_redraw = True
+            elif event.type == pygame.MOUSEBUTTONDOWN and pour is not None and stop_rect.collidepoint(event.pos):
+                # Stop All acts on the press, not the release, and stops every pump.
+                emergency_stop()
+                full_redraw = True
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                # A touch lands a moving card where it was headed, then drags from there.
+                tweener.finish("card")
+                if not overlay and show_scrubber() and scrubber_rect.collidepoint(event.pos):
+                    scrubbing = True
+                    scrub_to(event.pos[1])
                 else:
-                    # Animate snapping back if swipe is insufficient.
-                    start_offset = drag_offset
-                    duration = 300
-                    start_time = pygame.time.get_ticks()
-                    while True:
-                        elapsed = pygame.time.get_ticks() - start_time
-                        progress = min(elapsed / duration, 1.0)
-                        current_offset = start_offset * (1 - progress)
-                        if background:
-                            screen.blit(background, (0, 0))
-                        else:
-                            screen.fill((0, 0, 0))
-                        screen.blit(current_image, (current_offset, 0))
-                        font = pygame.font.SysFont(None, normal_text_size)
-                        drink_name = current_cocktail_name
-                        text_surface = font.render(drink_name, True, (255, 255, 255))
-                        text_rect = text_surface.get_rect(center=text_position)
-                        screen.blit(text_surface, text_rect)
-                        # Draw extra logos.
-                        if single_logo:
-                            screen.blit(single_logo, single_rect)
-                        if double_logo:
-                            screen.blit(double_logo, double_rect)
-                        pygame.display.flip()
-                        if progress >= 1.0:
-                            break
-                        clock.tick(60)
+                    dragging = True
+                    drag_start_x = event.pos[0]
+                    drag_velocity.reset(event.pos[0])
+                full_redraw = True
+            elif event.type == pygame.MOUSEMOTION and scrubbing:
+                scrub_to(event.pos[1])
+                full_redraw = True
+            elif event.type == pygame.MOUSEBUTTONUP and scrubbing:
+                scrubbing = False
+            elif event.type == pygame.MOUSEMOTION and dragging:
+                drag_velocity.add(event.pos[0])
+                moved = event.pos[0] - drag_start_x
+                if not overlay:
+                    scene.offset = moved
+                    full_redraw = True
+                elif abs(moved) > screen_width / 8:
+                    # Swiping the pouring overlay aside keeps the pour going and the menu scrollable.
+                    overlay = False
+                    drag_start_x = event.pos[0]
+            elif event.type == pygame.MOUSEBUTTONUP and dragging:
                 dragging = False
-                drag_offset = 0
+                release(event.pos)
+                full_redraw = True
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                full_redraw = True
 
-        # Main drawing (when not in special animation)
-        if background:
-            screen.blit(background, (0, 0))
+        # Sliding cards cover the whole screen.
+        if tweener.running("card"):
+            full_redraw = True
+        tweener.step()
+        if not DIRTY_RENDERING or overlay != overlay_drawn:
+            full_redraw = True
+
+        started = time.perf_counter()
+        progress = pour_progress(pour) if pour is not None else None
+        if overlay:
+            frame_index = int(time.monotonic() * SPINNER_FPS) % spinner.count
+            spinner_rect = spinner.rect(frame_index, spinner_center)
+            panel_rect = progress_panel_rect(screen, progress)
+            layout = {"spinner": (spinner_rect, frame_index),
+                      "progress": (panel_rect, progress_signature(panel_rect, progress))}
+            draw, args, kind = draw_overlay, (frame_index, spinner_rect, panel_rect), "pouring"
         else:
-            screen.fill((0, 0, 0))
-        if dragging:
-            screen.blit(current_image, (drag_offset, 0))
-            if drag_offset < 0:
-                screen.blit(next_image, (screen_width + drag_offset, 0))
-            elif drag_offset > 0:
-                screen.blit(previous_image, (-screen_width + drag_offset, 0))
+            layout = {"single": (logo_rect(single_rect, scene.single_size), None),
+                      "double": (logo_rect(double_rect, scene.double_size), None)}
+            if pour is not None:
+                layout["progress"] = (menu_bar_rect, int(progress["fraction"] * menu_bar_rect.width))
+                layout["stop"] = (stop_rect, None)
+            if show_scrubber():
+                layout["scrubber"] = (scrubber_rect, cocktails.section_of(current_index))
+            draw, args, kind = draw_menu, (), "scene"
+
+        if full_redraw:
+            draw(*args)
+            present(screen, None, started, kind)
+            if startup is not None:
+                STARTUP_SECONDS.set(time.perf_counter() - startup)
+                print(f"First frame {(time.perf_counter() - startup) * 1000:.0f} ms after startup")
+                startup = None
+                export_metrics()
         else:
-            screen.blit(current_image, (0, 0))
-        font = pygame.font.SysFont(None, normal_text_size)
-        drink_name = current_cocktail_name
-        text_surface = font.render(drink_name, True, (255, 255, 255))
-        text_rect = text_surface.get_rect(center=text_position)
-        screen.blit(text_surface, text_rect)
-        # Draw extra logos at their base size.
-        if single_logo:
-            screen.blit(single_logo, single_rect)
-        if double_logo:
-            screen.blit(double_logo, double_rect)
-        pygame.display.flip()
-        clock.tick(60)
+            # Only the parts that moved or changed: draw the scene clipped to each of them.
+            dirty = [rect.union(drawn[name][0]) if name in drawn else rect
+                     for name, (rect, shown) in layout.items() if drawn.get(name) != (rect, shown)]
+            for rect in dirty:
+                screen.set_clip(rect)
+                draw(*args)
+            screen.set_clip(None)
+            if dirty:
+                present(screen, dirty, started, "animation" if kind == "scene" else kind)
+        drawn = layout
+        overlay_drawn = overlay
+        full_redraw = False
+        clock.tick(INTERFACE_FPS)
+    if menu_watcher is not None:
+        menu_watcher.close()
+    card_cache.close()
     pygame.quit()
 
 if __name__ == "__main__":
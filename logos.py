@@ -0,0 +1,244 @@
+# logos.py
+"""
+Cocktail logo generation for the Streamlit app.
+
+A logo takes three slow steps: an image generation request, downloading the
+result, and removing its background. LogoPipeline runs the two network
+steps for up to LOGO_CONCURRENCY cocktails at once and queues the downloads
+to the background-removal worker processes (see background.py), which keep
+every core busy. Requests that fail with a network error, a timeout, a rate
+limit or a server error are retried with exponential backoff; each logo's
+outcome, attempts and time per stage are reported rather than swallowed.
+
+The image API and the downloads go wherever OPENAI_BASE_URL and the URLs it
+returns point, so `python bench_logos.py` can run the pipeline against a
+local stand-in server.
+"""
+import io
+import os
+import sys
+import time
+import random
+import threading
+import concurrent.futures
+
+import metrics
+import background
+from settings import *
+from helpers import get_safe_name, write_atomic
+
+LOGO_STAGE_SECONDS = metrics.REGISTRY.histogram(
+    "tipsy_logo_stage_seconds", "Time each logo generation stage took, retries included.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60))
+LOGO_FAILURES = metrics.REGISTRY.counter(
+    "tipsy_logo_failures_total", "Logos that couldn't be made, by the stage that failed.")
+
+STAGES = ("generate", "download", "remove_background", "save")
+
+
+def logo_prompt(normal_name):
+    return (
+        f"A realistic illustration of a {normal_name} cocktail on a plain white background. "
+        "The lighting and shading create depth and realism, making the drink appear fresh and inviting."
+    )
+
+
+def logo_path(normal_name):
+    return os.path.join(LOGO_FOLDER, f"{get_safe_name(normal_name)}.png")
+
+
+def transient_errors():
+    """Exception types for a dropped connection or a timeout, from the HTTP clients loaded so far."""
+    types = [ConnectionError, TimeoutError]
+    if "requests" in sys.modules:
+        exceptions = sys.modules["requests"].exceptions
+        types += [exceptions.ConnectionError, exceptions.Timeout]
+    if "openai" in sys.modules:
+        # APITimeoutError is a kind of APIConnectionError.
+        types.append(sys.modules["openai"].APIConnectionError)
+    return tuple(types)
+
+
+def is_retryable(error):
+    """
+    Connection errors, timeouts, rate limits and server errors (408, 429,
+    5xx) are worth another try. Anything else, such as a refused prompt, a
+    missing API key or a malformed URL, would only fail the same way again.
+    """
+    transient = transient_errors()
+    while error is not None:
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return status in (408, 429) or status >= 500
+        if isinstance(error, transient):
+            return True
+        error = error.__cause__
+    return False
+
+
+class LogoJob:
+    """One cocktail's way through the pipeline, and its report once finished."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.seconds = {}  # stage -> seconds, retries and backoff included
+        self.attempts = {}  # stage -> attempts made
+        self.stage = None  # the stage that failed, if any
+        self.error = None
+        self.image = None  # what the last stage produced, passed to the next
+        self.skipped = False  # the logo already existed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def describe(self):
+        if self.skipped:
+            return f"{self.name}: already had a logo"
+        if not self.ok:
+            return (f"{self.name}: {self.stage} failed after {self.attempts.get(self.stage, 0)} "
+                    f"attempt(s): {self.error}")
+        stages = ", ".join(f"{stage} {self.seconds[stage]:.1f} s" for stage in STAGES if stage in self.seconds)
+        return f"{self.name}: {stages}"
+
+
+class LogoPipeline:
+    """
+    Makes logos for many cocktails at once. `generate(prompt)` returns an
+    image URL, `download(url)` its bytes and `remove(data)` a PIL image;
+    each defaults to the real thing and can be replaced (e.g. in a benchmark).
+    """
+
+    def __init__(self, concurrency=LOGO_CONCURRENCY, retries=LOGO_RETRIES, backoff=LOGO_BACKOFF_SECONDS,
+                 timeout=LOGO_TIMEOUT_SECONDS, generate=None, download=None,
+                 remove=background.remove_background):
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.generate = generate or self._generate
+        self.download = download or self._download
+        self.remove = remove
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def _generate(self, prompt):
+        import assist
+        # The pipeline does its own retries, so the client's are turned off.
+        return assist.generate_image(prompt, max_retries=0, timeout=self.timeout)
+
+    def _download(self, url):
+        import requests
+        with self._session_lock:
+            if self._session is None:
+                # One session, so downloads from the same host reuse connections.
+                self._session = requests.Session()
+        response = self._session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.content
+
+    def _stage(self, job, stage, fn, *args, retry=True):
+        """Run one stage, with retries if `retry`, timing it on the job. Returns False if it failed for good."""
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                try:
+                    job.image = fn(*args)
+                    return True
+                except Exception as e:
+                    if not retry or attempt > self.retries or not is_retryable(e):
+                        job.stage, job.error = stage, e
+                        LOGO_FAILURES.inc(stage=stage)
+                        return False
+                    # Exponential backoff with jitter, so parallel requests don't retry in lockstep.
+                    time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        finally:
+            job.attempts[stage] = attempt
+            job.seconds[stage] = time.perf_counter() - started
+            LOGO_STAGE_SECONDS.observe(job.seconds[stage], stage=stage)
+
+    def _fetch(self, job):
+        """The network stages: ask for the image and download it."""
+        if self._stage(job, "generate", self.generate, logo_prompt(job.name)):
+            self._stage(job, "download", self.download, job.image)
+        return job
+
+    def _finish(self, job):
+        """The CPU stages: remove the background and save the logo and its thumbnail. Retrying these wouldn't help."""
+        if self.remove is not None and not self._stage(job, "remove_background", self.remove, job.image,
+                                                       retry=False):
+            return job
+        if self.remove is None:
+            from PIL import Image
+            job.image = Image.open(io.BytesIO(job.image))
+        self._stage(job, "save", self._save, job, retry=False)
+        job.image = None
+        return job
+
+    def _save(self, job):
+        import thumbnails
+        out = io.BytesIO()
+        job.image.save(out, "PNG")
+        # The kiosk watches LOGO_FOLDER; it never sees half a logo.
+        write_atomic(job.path, out.getvalue())
+        thumbnails.thumbnail_url(job.path)
+
+    def run(self, names):
+        """
+        Make logos for the cocktails in `names`, skipping ones that already
+        have a logo. Yields each LogoJob as it finishes, in completion order.
+        """
+        jobs = []
+        for name in dict.fromkeys(names):
+            job = LogoJob(name, logo_path(name))
+            if os.path.exists(job.path):
+                job.skipped = True
+                yield job
+            else:
+                jobs.append(job)
+        if not jobs:
+            return
+        with concurrent.futures.ThreadPoolExecutor(self.concurrency, thread_name_prefix="logo-fetch") as network, \
+                concurrent.futures.ThreadPoolExecutor(REMBG_WORKERS, thread_name_prefix="logo-finish") as cpu:
+            pending = {network.submit(self._fetch, job) for job in jobs}
+            finishing = set()
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    job = future.result()
+                    if job.ok and future not in finishing:
+                        # Downloaded: queue it for background removal and fetch the next one meanwhile.
+                        finishing_future = cpu.submit(self._finish, job)
+                        finishing.add(finishing_future)
+                        pending.add(finishing_future)
+                    else:
+                        yield job
+
+
+def generate_logos(names, **options):
+    """Make logos for `names` with a LogoPipeline; returns every LogoJob, in completion order."""
+    return list(LogoPipeline(**options).run(names))
+
+
+def summarize(jobs, wall_seconds):
+    """One line on a run: how many logos were made, failed or skipped, and the mean time per stage."""
+    made = [job for job in jobs if job.ok and not job.skipped]
+    failed = [job for job in jobs if not job.ok]
+    means = []
+    for stage in STAGES:
+        times = [job.seconds[stage] for job in made if stage in job.seconds]
+        if times:
+            means.append(f"{stage} {sum(times) / len(times):.1f} s")
+    line = f"{len(made)} logos in {wall_seconds:.1f} s"
+    if failed:
+        line += f", {len(failed)} failed"
+    if len(jobs) > len(made) + len(failed):
+        line += f", {len(jobs) - len(made) - len(failed)} already made"
+    if means:
+        line += f" (mean per logo: {', '.join(means)})"
+    return line
@@ -0,0 +1,160 @@
+# menu.py
+"""
+The kiosk's menu and the arithmetic behind fast navigation.
+
+MenuManifest is the list of cocktails the kiosk can show (those with a
+logo), built once from cocktails.json and a single scan of LOGO_FOLDER,
+with lookups by name and by initial letter that don't walk the menu. Hot
+reloads update it from the files that changed instead of rescanning.
+
+VelocityTracker and flick_cards turn the end of a drag into a number of
+cards to travel, so a hard flick crosses many cards at once.
+"""
+import os
+import time
+import collections
+
+from settings import *
+from helpers import load_cocktails
+
+# Fastest flick that still only snaps to the next card, in pixels per second.
+FLICK_MIN_VELOCITY = 600
+# How quickly a flicked menu slows down, in pixels per second squared.
+FLICK_DECELERATION = 2500
+# Only the last moments of a drag count toward its release velocity.
+VELOCITY_WINDOW = 0.1
+
+
+def menu_name(cocktail):
+    return cocktail.get('normal_name', '')
+
+
+def logo_file_name(cocktail):
+    """File name of a cocktail's logo in LOGO_FOLDER (see assets.cocktail_image_path)."""
+    return f'{menu_name(cocktail).lower().replace(" ", "_")}.png'
+
+
+def initial(name):
+    """The scrubber section a name falls under: its first letter, or '#' for anything else."""
+    first = name.strip()[:1].upper()
+    return first if first.isalpha() else "#"
+
+
+def scan_logos(folder=LOGO_FOLDER):
+    """Names of the files in `folder`, from one directory read."""
+    try:
+        with os.scandir(folder) as entries:
+            return {entry.name for entry in entries}
+    except OSError:
+        return set()
+
+
+class MenuManifest:
+    """
+    The cocktails in `cocktails` whose logo is among `logos`, in menu order
+    (by name when MENU_SORT is 'name', else as in cocktails.json). Indexing
+    and len() work like a list; index_of() and section_start() are lookups.
+    """
+
+    def __init__(self, cocktails, logos):
+        self.all_cocktails = list(cocktails)
+        self.logos = set(logos)
+        shown = [cocktail for cocktail in self.all_cocktails if logo_file_name(cocktail) in self.logos]
+        if MENU_SORT == 'name':
+            shown.sort(key=lambda cocktail: menu_name(cocktail).casefold())
+        self.cocktails = shown
+        self._index = {}
+        self._sections = {}
+        for index, cocktail in enumerate(shown):
+            name = menu_name(cocktail)
+            self._index.setdefault(name, index)
+            self._sections.setdefault(initial(name), index)
+        self.sections = sorted(self._sections)
+
+    @classmethod
+    def load(cls):
+        """Read cocktails.json and scan LOGO_FOLDER once."""
+        return cls(load_cocktails().get('cocktails', []), scan_logos())
+
+    def updated(self, cocktails=None, changed_logos=()):
+        """
+        A manifest with new `cocktails` (if given) and the logo files in
+        `changed_logos` re-checked; every other logo is taken as unchanged.
+        """
+        logos = set(self.logos)
+        for path in changed_logos:
+            name = os.path.basename(path)
+            if os.path.exists(path):
+                logos.add(name)
+            else:
+                logos.discard(name)
+        return MenuManifest(self.all_cocktails if cocktails is None else cocktails, logos)
+
+    def __len__(self):
+        return len(self.cocktails)
+
+    def __getitem__(self, index):
+        return self.cocktails[index]
+
+    def names(self):
+        return [menu_name(cocktail) for cocktail in self.cocktails]
+
+    def index_of(self, name, default=None):
+        return self._index.get(name, default)
+
+    def section_start(self, section):
+        """Index of the first cocktail under `section` (a letter from `sections`)."""
+        return self._sections[section]
+
+    def section_of(self, index):
+        return initial(menu_name(self.cocktails[index]))
+
+
+class VelocityTracker:
+    """Horizontal velocity of a drag over its last VELOCITY_WINDOW seconds."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._samples = collections.deque()
+
+    def reset(self, x):
+        self._samples.clear()
+        self.add(x)
+
+    def add(self, x):
+        now = self.clock()
+        self._samples.append((now, x))
+        while len(self._samples) > 2 and now - self._samples[0][0] > VELOCITY_WINDOW:
+            self._samples.popleft()
+
+    def velocity(self):
+        """Pixels per second; 0 if the finger has rested longer than the window."""
+        if len(self._samples) < 2:
+            return 0.0
+        (first_time, first_x), (last_time, last_x) = self._samples[0], self._samples[-1]
+        if self.clock() - last_time > VELOCITY_WINDOW or last_time <= first_time:
+            return 0.0
+        return (last_x - first_x) / (last_time - first_time)
+
+
+def flick_cards(velocity, card_width, max_cards=FLICK_MAX_CARDS):
+    """
+    Cards a release at `velocity` (pixels per second) carries the menu: the
+    distance it would coast at FLICK_DECELERATION, in whole cards, at least
+    one and at most `max_cards`. 0 for a release too slow to count as a flick.
+    """
+    if abs(velocity) < FLICK_MIN_VELOCITY:
+        return 0
+    distance = velocity ** 2 / (2 * FLICK_DECELERATION)
+    return max(1, min(round(distance / card_width), max_cards))
+
+
+def flick_seconds(distance, velocity):
+    """How long coasting `distance` pixels takes when released at `velocity`, slowing evenly (ease_out_quad)."""
+    return max(0.3, min(2 * abs(distance) / max(abs(velocity), 1.0), 1.5))
+
+
+def section_at(sections, top, height, y):
+    """The section in `sections` drawn at height `y` on a scrubber spanning `top` to `top + height`."""
+    row = (y - top) * len(sections) // max(height, 1)
+    return sections[max(0, min(int(row), len(sections) - 1))]
@@ -0,0 +1,213 @@
+# metrics.py
+"""
+In-process metrics registry: counters, gauges and histograms with optional
+labels, exported as JSON or Prometheus text, to a file or a local HTTP endpoint.
+
+Recording a value is a dict lookup and an add under a per-metric lock, so it is
+cheap enough for the pump timer thread.
+"""
+import json
+import time
+import bisect
+import threading
+
+from helpers import write_atomic
+
+# Default histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return {_format_labels(key) or "value": value for key, value in self._values.items()}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., count, sum, max]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0, 0.0, value]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-3] += 1
+            series[-2] += value
+            series[-1] = max(series[-1], value)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), cumulative))
+            samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), values[-3]))
+            samples.append((f"{self.name}_count", key, values[-3]))
+            samples.append((f"{self.name}_sum", key, values[-2]))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        snapshot = {}
+        for key, values in series.items():
+            count, total, maximum = values[-3:]
+            snapshot[_format_labels(key) or "value"] = {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "max": maximum,
+                "buckets": {repr(float(bound)): hits for bound, hits in zip(self.buckets, values) if hits},
+            }
+        return snapshot
+
+
+class Registry:
+    """A named set of metrics plus collect callbacks that refresh derived gauges before export."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def on_collect(self, fn):
+        """Call `fn()` before every export, e.g. to set gauges derived from other state."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def _collect(self):
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for fn in collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        return metrics
+
+    def to_json(self):
+        metrics = self._collect()
+        return json.dumps({
+            "uptime_seconds": time.time() - self.started,
+            "metrics": {metric.name: {"type": metric.kind, "help": metric.help, "values": metric.snapshot()}
+                        for metric in metrics},
+        }, indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        for metric in self._collect():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write all metrics to `path`: Prometheus text for *.prom/*.txt, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        write_atomic(path, text)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics (Prometheus text) and /metrics.json on a background thread."""
+        import http.server
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, content_type = registry.to_json(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+        thread.start()
+        return server
+
+
+REGISTRY = Registry()
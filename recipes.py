@@ -0,0 +1,170 @@
+# recipes.py
+"""
+Recipe compiler: turns a cocktail from cocktails.json into an immutable plan of
+(pump_index, ounces, seconds) so the pour path never has to parse measurement
+strings or scan pump labels.
+
+The ingredient -> pump index and the compiled recipes are cached and rebuilt
+only when pump_config.json or cocktails.json change on disk (by mtime).
+"""
+import os
+import threading
+import collections
+
+from settings import *
+from helpers import read_json
+
+CompiledPour = collections.namedtuple("CompiledPour", ["pump_index", "ingredient", "ounces", "seconds"])
+CompiledRecipe = collections.namedtuple("CompiledRecipe", ["name", "single_or_double", "pours", "skipped"])
+
+# Ounces per unit for the measurements recipes use; a bare number is ounces.
+UNIT_OUNCES = {
+    "oz": 1.0, "ounce": 1.0, "ounces": 1.0,
+    "ml": 1 / 29.5735,
+    "cl": 1 / 2.95735,
+    "tsp": 1 / 6, "teaspoon": 1 / 6, "teaspoons": 1 / 6,
+    "tbsp": 0.5, "tablespoon": 0.5, "tablespoons": 0.5,
+    "dash": 1 / 32, "dashes": 1 / 32,
+    "splash": 0.25, "splashes": 0.25,
+}
+
+# Compiled recipes kept per pump configuration (adjusted recipes from the app add up).
+COMPILED_CACHE_SIZE = 256
+
+_lock = threading.Lock()
+_file_cache = {}  # (path, builder) -> (mtime_ns, value)
+_compiled = collections.OrderedDict()
+_compiled_config_mtime = None
+
+
+def normalize_ingredient(name):
+    """Canonical form of an ingredient name: lower case, single spaces, aliases resolved."""
+    normalized = " ".join(name.lower().split())
+    return INGREDIENT_ALIASES.get(normalized, normalized)
+
+
+def parse_measurement(measurement):
+    """
+    Parse a measurement like "2 oz", "0.75 oz" or "2 dashes" into ounces.
+    Returns None if it's unparseable or its unit isn't a volume (e.g. "1 wedge").
+    """
+    parts = measurement.split()
+    if not parts:
+        return None
+    try:
+        amount = float(parts[0])
+    except ValueError:
+        return None
+    unit = parts[1].lower().rstrip(".") if len(parts) > 1 else "oz"
+    if unit not in UNIT_OUNCES:
+        return None
+    return amount * UNIT_OUNCES[unit]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _cached(path, build):
+    """Return build(path), rebuilding only when the file's mtime has changed."""
+    mtime = _mtime(path)
+    with _lock:
+        cached = _file_cache.get((path, build))
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    value = build(path)
+    with _lock:
+        _file_cache[(path, build)] = (mtime, value)
+    return value
+
+
+def _build_pump_index(path):
+    index = {}
+    for pump_label, ingredient in read_json(path).items():
+        # parse 'Pump 1' -> index=0
+        try:
+            pump_index = int(pump_label.replace("Pump", "").strip()) - 1
+        except ValueError:
+            print(f"Could not parse pump label '{pump_label}'. Skipping.")
+            continue
+        if pump_index < 0 or pump_index >= len(OZ_COEFFICIENT):
+            print(f"Pump index {pump_index} out of range for '{ingredient}'. Skipping.")
+            continue
+        if ingredient and ingredient.strip():
+            index.setdefault(normalize_ingredient(ingredient), pump_index)
+    return index
+
+
+def _build_cocktail_index(path):
+    return {cocktail.get("normal_name", ""): cocktail
+            for cocktail in read_json(path).get("cocktails", [])}
+
+
+def pump_index():
+    """{normalized ingredient: pump index} for the current pump_config.json."""
+    return _cached(CONFIG_FILE, _build_pump_index)
+
+
+def cocktails_by_name():
+    """{normal_name: cocktail dict} for the current cocktails.json."""
+    return _cached(COCKTAILS_FILE, _build_cocktail_index)
+
+
+def _compile(recipe, single_or_double, index):
+    factor = 2 if single_or_double.lower() == "double" else 1
+    pours = []
+    skipped = []
+    for ingredient_name, measurement_str in recipe.get("ingredients", {}).items():
+        ounces = parse_measurement(measurement_str)
+        if ounces is None:
+            skipped.append(f"Cannot parse measurement '{measurement_str}' for {ingredient_name}.")
+            continue
+        if ounces <= 0:
+            skipped.append(f"Nothing to pour for {ingredient_name} ('{measurement_str}').")
+            continue
+        pump = index.get(normalize_ingredient(ingredient_name))
+        if pump is None:
+            skipped.append(f"No pump mapped to ingredient '{ingredient_name}'.")
+            continue
+        ounces *= factor
+        pours.append(CompiledPour(pump, ingredient_name, ounces, ounces * OZ_COEFFICIENT[pump]))
+    return CompiledRecipe(recipe.get("normal_name", ""), single_or_double.lower(), tuple(pours), tuple(skipped))
+
+
+def compile_recipe(recipe, single_or_double="single"):
+    """
+    Compile a recipe dict (as found in cocktails.json, possibly adjusted) into a
+    CompiledRecipe. Results are cached until pump_config.json changes.
+    """
+    global _compiled_config_mtime
+    index = pump_index()
+    key = (recipe.get("normal_name", ""), single_or_double.lower(),
+           tuple(recipe.get("ingredients", {}).items()))
+    config_mtime = _mtime(CONFIG_FILE)
+    with _lock:
+        if config_mtime != _compiled_config_mtime:
+            _compiled.clear()
+            _compiled_config_mtime = config_mtime
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+    compiled = _compile(recipe, single_or_double, index)
+    for message in compiled.skipped:
+        print(f"{message} Skipping.")
+    with _lock:
+        _compiled[key] = compiled
+        if len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def compile_cocktail(name, single_or_double="single"):
+    """Compile the cocktail called `name` in cocktails.json, or return None if there isn't one."""
+    cocktail = cocktails_by_name().get(name)
+    if cocktail is None:
+        return None
+    return compile_recipe(cocktail, single_or_double)
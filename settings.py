@@ -8,6 +8,7 @@ load_dotenv()
 CONFIG_FILE = "pump_config.json"
 COCKTAILS_FILE = "cocktails.json"
 LOGO_FOLDER = "drink_logos"
+THUMBNAIL_FOLDER = "static/thumbnails"
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -29,6 +30,109 @@ try:
 except ValueError:
     OZ_COEFFICIENT = 8.0
 
+# Ingredient spellings that should resolve to the same pump (keys and values in lower case).
+INGREDIENT_ALIASES = {
+    "whisky": "whiskey",
+    "bourbon whiskey": "bourbon",
+    "cola": "coke",
+    "coca cola": "coke",
+    "coca-cola": "coke",
+    "sugar syrup": "simple syrup",
+    "fresh lime juice": "lime juice",
+    "fresh lemon juice": "lemon juice",
+    "cointreau": "triple sec",
+    "angostura bitters": "bitters",
+    "white rum": "rum",
+    "light rum": "rum",
+    "tonic": "tonic water",
+    "soda": "soda water",
+    "club soda": "soda water",
+}
+
+# Pump hardware backend: 'gpio' (Raspberry Pi pins), 'debug' (print only) or 'sim' (simulated, virtual clock).
+PUMP_BACKEND = os.getenv('PUMP_BACKEND', 'gpio')
+
+# Pour telemetry: written to METRICS_FILE (.json, or .prom for Prometheus text) after every order and,
+# in the kiosk, every METRICS_EXPORT_SECONDS from startup; served on http://127.0.0.1:METRICS_PORT/metrics
+# when METRICS_PORT is set.
+METRICS_FILE = os.getenv('METRICS_FILE', '')
+METRICS_EXPORT_SECONDS = float(os.getenv('METRICS_EXPORT_SECONDS', 10))
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
 INVERT_PUMP_PINS = os.getenv('INVERT_PUMP_PINS', 'false') == 'true'
-PUMP_CONCURRENCY = int(os.getenv('PUMP_CONCURRENCY', 3))
+# Hard cap on pumps running at once; the current budget below is what normally limits it.
+PUMP_CONCURRENCY = int(os.getenv('PUMP_CONCURRENCY', 12))
+# Batch size of the fixed-batch scheme the pour planner replaced, for comparison only. That scheme poured
+# PUMP_CONCURRENCY pumps at a time, and PUMP_CONCURRENCY defaulted to 3 before the current budget took over.
+BARRIER_BATCH_SIZE = max(1, int(os.getenv('PUMP_CONCURRENCY', 3)))
+
+# Steady-state current draw of each pump in amps (override with a comma separated PUMP_CURRENT).
+PUMP_CURRENT = [
+    0.6,  # Pump 1
+    0.6,  # Pump 2
+    0.6,  # Pump 3
+    0.6,  # Pump 4
+    0.6,  # Pump 5
+    0.6,  # Pump 6
+    0.6,  # Pump 7
+    0.6,  # Pump 8
+    0.6,  # Pump 9
+    0.6,  # Pump 10
+    0.6,  # Pump 11
+    0.6,  # Pump 12
+]
+if os.getenv('PUMP_CURRENT'):
+    PUMP_CURRENT = [float(amps) for amps in os.getenv('PUMP_CURRENT').split(',')]
+    if len(PUMP_CURRENT) != 12:
+        raise ValueError(f"PUMP_CURRENT has {len(PUMP_CURRENT)} values; it needs one per pump (12)")
+
+# Total current the pump power supply can deliver, in amps. Enforced per process: the kiosk and the Streamlit
+# app each schedule their own pours, so run pours from only one of them if the supply can't take both.
+PUMP_CURRENT_BUDGET = float(os.getenv('PUMP_CURRENT_BUDGET', 2.4))
+# Motors draw PUMP_INRUSH_FACTOR times their running current for PUMP_INRUSH_SECONDS after starting.
+PUMP_INRUSH_FACTOR = float(os.getenv('PUMP_INRUSH_FACTOR', 2.0))
+PUMP_INRUSH_SECONDS = float(os.getenv('PUMP_INRUSH_SECONDS', 0.3))
+# An emergency stop from the kiosk or the Streamlit app writes this file; every other process that drives
+# the pumps watches it and stops its motors and cancels its orders too.
+EMERGENCY_STOP_FILE = os.getenv('EMERGENCY_STOP_FILE', '.emergency_stop')
+# Where the interface keeps images pre-scaled to the screen as raw pixels (empty disables it).
+SURFACE_CACHE_DIR = os.getenv('SURFACE_CACHE_DIR', '.surface_cache')
+# Memory budget for decoded cocktail cards in the interface, and how many cards either side of
+# the current one are prefetched in the background.
+SURFACE_CACHE_MB = int(os.getenv('SURFACE_CACHE_MB', 96))
+PREFETCH_CARDS = int(os.getenv('PREFETCH_CARDS', 3))
+# Rendered text surfaces kept by the interface (zoom animations render one per size).
+TEXT_CACHE_SIZE = int(os.getenv('TEXT_CACHE_SIZE', 256))
+# Idle-aware rendering: sleep on input while the kiosk is static and update only changed regions.
+# Set to 'false' to redraw the full screen at 60 fps (e.g. to compare tipsy_frame_seconds and CPU time).
+DIRTY_RENDERING = os.getenv('DIRTY_RENDERING', 'true') == 'true'
+# Interface frame rate cap, and the pouring spinner: SPINNER_FRAMES pre-rendered rotations shown at SPINNER_FPS.
+INTERFACE_FPS = int(os.getenv('INTERFACE_FPS', 60))
+SPINNER_FRAMES = int(os.getenv('SPINNER_FRAMES', 36))
+SPINNER_FPS = int(os.getenv('SPINNER_FPS', 20))
+# Gallery thumbnails in the Streamlit app: longest side in pixels (twice the displayed 300 px, for
+# high-DPI screens) and WebP quality.
+THUMBNAIL_SIZE = int(os.getenv('THUMBNAIL_SIZE', 600))
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', 80))
+# Cocktails per page in the Streamlit gallery.
+GALLERY_PAGE_SIZE = int(os.getenv('GALLERY_PAGE_SIZE', 12))
+# Kiosk menu order: 'name' (alphabetical, matching the letter scrubber) or 'file' (as in cocktails.json),
+# and the most cards one flick can travel.
+MENU_SORT = os.getenv('MENU_SORT', 'name')
+FLICK_MAX_CARDS = int(os.getenv('FLICK_MAX_CARDS', 25))
+# Hot reload: the kiosk picks up changes to cocktails.json, pump_config.json and drink_logos while running,
+# through inotify where available and otherwise by checking mtimes every FILE_POLL_SECONDS.
+HOT_RELOAD = os.getenv('HOT_RELOAD', 'true') == 'true'
+FILE_POLL_SECONDS = float(os.getenv('FILE_POLL_SECONDS', 2.0))
+# Logo generation in the Streamlit app: cocktails whose image is requested and downloaded at once, retries
+# per request after a network error, rate limit or server error (waiting LOGO_BACKOFF_SECONDS, doubling each
+# time), and the timeout of each request.
+LOGO_CONCURRENCY = int(os.getenv('LOGO_CONCURRENCY', 4))
+LOGO_RETRIES = int(os.getenv('LOGO_RETRIES', 3))
+LOGO_BACKOFF_SECONDS = float(os.getenv('LOGO_BACKOFF_SECONDS', 2.0))
+LOGO_TIMEOUT_SECONDS = float(os.getenv('LOGO_TIMEOUT_SECONDS', 120))
+# Background removal: worker processes that each keep a rembg session for REMBG_MODEL loaded and share the CPU
+# cores between them.
+REMBG_WORKERS = int(os.getenv('REMBG_WORKERS', 2))
+REMBG_MODEL = os.getenv('REMBG_MODEL', 'u2net')
 FULL_SCREEN = os.getenv('FULL_SCREEN', 'true') == 'true'
\ No newline at end of file
@@ -0,0 +1,153 @@
+# thumbnails.py
+"""
+Gallery thumbnails for the Streamlit app.
+
+Each cocktail logo gets a small WebP (PNG where Pillow lacks WebP support)
+in THUMBNAIL_FOLDER, named after a hash of the logo's content. It's made
+once, when helpers.generate_image saves the logo, or by
+
+    python thumbnails.py            # backfill thumbnails for every logo in drink_logos
+    python thumbnails.py --prune    # ... and delete thumbnails of logos that changed or are gone
+
+Streamlit serves ./static as static files (server.enableStaticServing in
+.streamlit/config.toml). It sends no Cache-Control header, so browsers only
+cache a thumbnail heuristically (from its Last-Modified date); the hash in
+the file name means a regenerated logo gets a new URL and never shows stale.
+"""
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+
+from settings import *
+from helpers import read_json, write_atomic
+
+# Where Streamlit serves THUMBNAIL_FOLDER (./static is served at app/static).
+THUMBNAIL_URL = "app/static/thumbnails"
+INDEX_FILE = "index.json"
+
+_lock = threading.Lock()
+_index = None  # logo path -> [mtime_ns, size, thumbnail file name]
+
+
+def _index_locked():
+    global _index
+    if _index is None:
+        _index = read_json(os.path.join(THUMBNAIL_FOLDER, INDEX_FILE))
+    return _index
+
+
+def save_index():
+    with _lock:
+        write_atomic(os.path.join(THUMBNAIL_FOLDER, INDEX_FILE), json.dumps(_index_locked(), indent=1))
+
+
+def thumbnail_format():
+    from PIL import features
+    return "webp" if features.check("webp") else "png"
+
+
+def make_thumbnail(logo_path, force=False, update_index=True):
+    """
+    Make the thumbnail for `logo_path` unless an up-to-date one exists, and
+    return its file name in THUMBNAIL_FOLDER. An unchanged logo (same mtime
+    and size) is recognized from the index without being read.
+    """
+    stat = os.stat(logo_path)
+    key = os.path.normpath(logo_path)
+    with _lock:
+        entry = _index_locked().get(key)
+    if (not force and entry and entry[:2] == [stat.st_mtime_ns, stat.st_size]
+            and os.path.exists(os.path.join(THUMBNAIL_FOLDER, entry[2]))):
+        return entry[2]
+
+    with open(logo_path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    fmt = thumbnail_format()
+    name = f"{os.path.splitext(os.path.basename(logo_path))[0]}-{digest}.{fmt}"
+    path = os.path.join(THUMBNAIL_FOLDER, name)
+    if force or not os.path.exists(path):
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+            out = io.BytesIO()
+            if fmt == "webp":
+                image.save(out, "WEBP", quality=THUMBNAIL_QUALITY, method=6)
+            else:
+                image.save(out, "PNG", optimize=True)
+        write_atomic(path, out.getvalue())
+
+    with _lock:
+        _index_locked()[key] = [stat.st_mtime_ns, stat.st_size, name]
+    if entry and entry[2] != name:
+        # The logo was regenerated: its old thumbnail is no longer linked from anywhere.
+        try:
+            os.remove(os.path.join(THUMBNAIL_FOLDER, entry[2]))
+        except OSError:
+            pass
+    if update_index:
+        save_index()
+    return name
+
+
+def thumbnail_url(logo_path):
+    """URL of the thumbnail for `logo_path`, made now if needed; None if it can't be made."""
+    try:
+        name = make_thumbnail(logo_path)
+    except Exception as e:
+        print(f"Error making a thumbnail for {logo_path}: {e}")
+        return None
+    return f"{THUMBNAIL_URL}/{name}"
+
+
+def backfill(force=False, prune=False):
+    """Make thumbnails for every logo in LOGO_FOLDER. Returns (logos, logo bytes, thumbnail bytes, pruned)."""
+    logos = []
+    if os.path.isdir(LOGO_FOLDER):
+        with os.scandir(LOGO_FOLDER) as entries:
+            logos = sorted(entry.path for entry in entries if entry.name.lower().endswith(".png"))
+    logo_bytes = thumbnail_bytes = 0
+    keep = {INDEX_FILE}
+    for logo_path in logos:
+        try:
+            name = make_thumbnail(logo_path, force, update_index=False)
+        except Exception as e:
+            print(f"Error making a thumbnail for {logo_path}: {e}")
+            continue
+        keep.add(name)
+        logo_bytes += os.path.getsize(logo_path)
+        thumbnail_bytes += os.path.getsize(os.path.join(THUMBNAIL_FOLDER, name))
+    pruned = 0
+    if prune and os.path.isdir(THUMBNAIL_FOLDER):
+        with _lock:
+            index = _index_locked()
+            for key in [key for key, entry in index.items() if entry[2] not in keep]:
+                del index[key]
+        for entry in os.scandir(THUMBNAIL_FOLDER):
+            if entry.name not in keep and not entry.name.endswith(".tmp"):
+                os.remove(entry.path)
+                pruned += 1
+    if logos:
+        save_index()
+    return len(logos), logo_bytes, thumbnail_bytes, pruned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make gallery thumbnails for the cocktail logos.")
+    parser.add_argument("--force", action="store_true", help="remake thumbnails even if they're up to date")
+    parser.add_argument("--prune", action="store_true", help="delete thumbnails no current logo uses")
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    count, logo_bytes, thumbnail_bytes, pruned = backfill(args.force, args.prune)
+    print(f"{count} logos ({logo_bytes / 1e6:.1f} MB) -> {thumbnail_bytes / 1e6:.2f} MB of thumbnails in "
+          f"{THUMBNAIL_FOLDER} ({time.perf_counter() - started:.1f} s, {pruned} pruned)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# tween.py
+"""
+Frame-driven animations for the pygame interface.
+
+Nothing here sleeps or loops: the interface's main loop calls
+Tweener.step(now) once per frame, and each animation moves an attribute of
+some object toward its target. Animations compose with Sequence and
+Parallel, and a keyed animation replaces whatever was running under the
+same key, so input never has to wait for an animation to finish.
+"""
+import time
+
+
+def linear(t):
+    return t
+
+
+def ease_out_quad(t):
+    return 1 - (1 - t) ** 2
+
+
+def ease_out_cubic(t):
+    return 1 - (1 - t) ** 3
+
+
+def ease_in_out_cubic(t):
+    return 4 * t ** 3 if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2
+
+
+def ease_out_back(t, overshoot=1.70158):
+    return 1 + (overshoot + 1) * (t - 1) ** 3 + overshoot * (t - 1) ** 2
+
+
+class Tween:
+    """Move `target.attr` from its value at the first step (or `start`) to `end` over `duration` seconds."""
+
+    def __init__(self, target, attr, end, duration, easing=ease_out_cubic, start=None):
+        self.target = target
+        self.attr = attr
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.easing = easing
+        self.started_at = None
+
+    def step(self, now):
+        """Advance to `now`. Returns the seconds left over once finished, or None while running."""
+        if self.started_at is None:
+            self.started_at = now
+            if self.start is None:
+                self.start = getattr(self.target, self.attr)
+        elapsed = now - self.started_at
+        progress = min(elapsed / self.duration, 1.0) if self.duration > 0 else 1.0
+        value = self.start + (self.end - self.start) * self.easing(progress)
+        setattr(self.target, self.attr, value)
+        if progress >= 1.0:
+            setattr(self.target, self.attr, self.end)
+            return elapsed - self.duration
+        return None
+
+
+class Wait:
+    """Do nothing for `duration` seconds."""
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.started_at = None
+
+    def step(self, now):
+        if self.started_at is None:
+            self.started_at = now
+        elapsed = now - self.started_at
+        return elapsed - self.duration if elapsed >= self.duration else None
+
+
+class Call:
+    """Call `fn()` once, then finish."""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def step(self, now):
+        self.fn()
+        return 0.0
+
+
+class Sequence:
+    """Run animations one after another."""
+
+    def __init__(self, *animations):
+        self.animations = list(animations)
+        self._index = 0
+
+    def step(self, now):
+        while self._index < len(self.animations):
+            left_over = self.animations[self._index].step(now)
+            if left_over is None:
+                return None
+            self._index += 1
+        return 0.0
+
+
+class Parallel:
+    """Run animations together; finishes when the last one does."""
+
+    def __init__(self, *animations):
+        self.running = list(animations)
+
+    def step(self, now):
+        self.running = [animation for animation in self.running if animation.step(now) is None]
+        return None if self.running else 0.0
+
+
+class Tweener:
+    """The set of running animations, stepped once per frame by the main loop."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._running = []  # [(key, animation)]
+
+    def start(self, animation, key=None):
+        """Run `animation`, replacing the one running under `key` (if any). Returns the animation."""
+        if key is not None:
+            self.cancel(key)
+        self._running.append((key, animation))
+        return animation
+
+    def finish(self, key):
+        """Jump the animation running under `key` (if any) straight to its end, running its callbacks."""
+        for k, animation in list(self._running):
+            if k == key:
+                # Each step starts the next part of a Sequence, so keep jumping ahead until it's done.
+                now = self.clock()
+                while animation.step(now) is None:
+                    now += 3600
+        self.cancel(key)
+
+    def cancel(self, key):
+        self._running = [(k, animation) for k, animation in self._running if k != key]
+
+    def running(self, key=None):
+        """True if any animation (or the one under `key`) is still running."""
+        if key is None:
+            return bool(self._running)
+        return any(k == key for k, _animation in self._running)
+
+    def step(self, now=None):
+        """Advance every animation to `now`. Returns True if anything was animating."""
+        if not self._running:
+            return False
+        now = self.clock() if now is None else now
+        running = list(self._running)
+        finished = {id(animation) for _key, animation in running if animation.step(now) is not None}
+        self._running = [(key, animation) for key, animation in self._running if id(animation) not in finished]
+        return True